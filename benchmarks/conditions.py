@@ -0,0 +1,93 @@
+"""
+Type checking of boolean conditions, in conditions per second.
+
+    python -m benchmarks.conditions
+"""
+import time
+from argparse import ArgumentParser
+from transpiler.lexer import Lexer
+from transpiler.syntax_analyzer import SyntaxAnalyzer
+from transpiler.semantic_analyzer import (
+    SemanticAnalyzer,
+    BooleanType,
+    VarType,
+)
+from transpiler.settings import Tag, LEXER_RULES, GRAMMAR_RULES
+
+
+CONDITIONS = [
+    'i > 1',
+    '(i + 2 * r >= 10) and not (s = c) or b',
+    "sqrt(r) < i or ('abc' <> s) and (c = 'x')",
+]
+
+
+def conditions_program(count: int) -> str:
+    lines = [
+        'var i: integer := 1;',
+        'var r: real := 1.5;',
+        "var s: string := 'str';",
+        "var c: char := 'c';",
+        'var b: boolean := true;',
+        'begin',
+    ]
+    for idx in range(count):
+        condition = CONDITIONS[idx % len(CONDITIONS)]
+        lines.append(f'    while {condition} do')
+        lines.append('        b := false;')
+    lines.append('end.')
+    return '\n'.join(lines) + '\n'
+
+
+def collect_conditions(code: str) -> tuple[BooleanType, list]:
+    """
+    Run semantic analysis once, recording every boolean type check, so
+    checks can be replayed without the rest of analysis. All variables of
+    the program are global, so the checker and its symbol table are still
+    valid for replay after analysis.
+    """
+    lexer = Lexer(Tag, LEXER_RULES)
+    lexer.buffer = code
+    tree = SyntaxAnalyzer(GRAMMAR_RULES).parse(lexer.tokens)
+
+    calls = []
+    semantic_analyzer = SemanticAnalyzer(tree, code)
+    checker = semantic_analyzer.type_checkers[VarType.BOOLEAN]
+
+    def record(expr):
+        calls.append(list(expr))
+        BooleanType.assert_(checker, expr)
+
+    checker.assert_ = record
+    semantic_analyzer.parse()
+    del checker.assert_
+    return checker, calls
+
+
+def measure(checker: BooleanType, calls: list, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for expr in calls:
+            checker.assert_(expr)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = ArgumentParser('Boolean conditions benchmark')
+    parser.add_argument('--count', type=int, default=2000,
+                        help='number of while loops with conditions')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs, the fastest one is reported')
+    args = parser.parse_args()
+
+    checker, calls = collect_conditions(conditions_program(args.count))
+    elapsed = measure(checker, calls, args.repeat)
+    print(f'{len(calls)} conditions in {elapsed:.3f}s, '
+          f'{len(calls) / elapsed:.0f} conditions/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+"""
+Performance regression gate: run the benchmark suite several times and
+compare it with a stored baseline.
+
+Every run of the suite measures all programs once, so runs interleave
+programs, and a slow moment of the machine affects a whole run rather
+than one program. Noise between runs is what decides the result, so a
+confidence interval is found by bootstrap over runs and over programs:
+every round picks runs of current and baseline results and programs
+with replacement.
+
+Stages are compared for every program shape separately, as ratio of
+current median time to the baseline one averaged geometrically over
+programs of the shape, so a slowdown of one shape is not hidden by the
+others. The gate fails when the whole interval of any stage and shape is
+above 1 + threshold.
+
+    python -m benchmarks.gate
+    python -m benchmarks.gate --update  # store new baseline
+
+Timings depend on the machine, so the baseline should be recorded on the
+same machine which runs the gate.
+"""
+import json
+import math
+import random
+import statistics
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+from benchmarks import suite
+from benchmarks.programs import SHAPES
+
+
+BASELINE_PATH = Path(__file__).parent / 'baseline.json'
+BOOTSTRAP_ROUNDS = 2000
+
+
+def collect_runs(runs: list[dict]) -> dict[tuple, dict[int, list[float]]]:
+    """
+    Return (stage, shape) -> size -> median time of every run. Grammar
+    construction is reported as stages 'grammar build' and 'grammar load'
+    of shape 'grammar'.
+    """
+    measurements = {}
+    for results in runs:
+        for name, stats in results['construction'].items():
+            measurements.setdefault((f'grammar {name}', 'grammar'), {}) \
+                .setdefault(0, []).append(stats['median'])
+        for program in results['programs']:
+            for stage, stats in program['stages'].items():
+                measurements.setdefault((stage, program['shape']), {}) \
+                    .setdefault(program['size'], []).append(stats['median'])
+    return measurements
+
+
+def geometric_mean_ratio(current: dict[int, list[float]],
+                         baseline: dict[int, list[float]],
+                         sizes: list[int],
+                         current_runs: list[int],
+                         baseline_runs: list[int]) -> float:
+    """
+    Geometric mean over programs of given sizes of ratios of median
+    times over given runs.
+    """
+    logs = [
+        math.log(
+            statistics.median(current[size][run] for run in current_runs) /
+            statistics.median(baseline[size][run] for run in baseline_runs)
+        )
+        for size in sizes
+    ]
+    return math.exp(statistics.fmean(logs))
+
+
+def compare_shape(current: dict[int, list[float]],
+                  baseline: dict[int, list[float]],
+                  confidence: float,
+                  rng: random.Random) -> tuple[float, float, float]:
+    """
+    Ratio of current time of a stage to the baseline one, over programs
+    measured in both, with bootstrap confidence interval.
+    """
+    sizes = [size for size in current if size in baseline]
+    current_count = min(len(current[size]) for size in sizes)
+    baseline_count = min(len(baseline[size]) for size in sizes)
+
+    def pick(count: int) -> list[int]:
+        # same runs for every program, as they share noise of the run
+        return rng.choices(range(count), k=count)
+
+    ratios = sorted(
+        geometric_mean_ratio(
+            current, baseline,
+            rng.choices(sizes, k=len(sizes)),
+            pick(current_count),
+            pick(baseline_count),
+        )
+        for _ in range(BOOTSTRAP_ROUNDS)
+    )
+    tail = (1 - confidence) / 2
+    low = ratios[int(tail * (BOOTSTRAP_ROUNDS - 1))]
+    high = ratios[int((1 - tail) * (BOOTSTRAP_ROUNDS - 1))]
+    ratio = geometric_mean_ratio(
+        current, baseline, sizes,
+        list(range(current_count)), list(range(baseline_count)),
+    )
+    return ratio, low, high
+
+
+def compare(current: list[dict], baseline: list[dict], threshold: float,
+            confidence: float) -> list[dict]:
+    """
+    Compare runs of the suite, return a row for every stage and shape.
+    """
+    rng = random.Random(0)
+    baseline_stages = collect_runs(baseline)
+    rows = []
+    for key, programs in collect_runs(current).items():
+        baseline_programs = baseline_stages.get(key, {})
+        if not any(size in baseline_programs for size in programs):
+            continue
+        ratio, low, high = compare_shape(
+            programs, baseline_programs, confidence, rng
+        )
+        if low > 1 + threshold:
+            status = 'SLOWER'
+        elif high < 1 - threshold:
+            status = 'faster'
+        else:
+            status = 'ok'
+        stage, shape = key
+        rows.append({
+            'stage': stage,
+            'shape': shape,
+            'programs': sum(size in baseline_programs for size in programs),
+            'ratio': ratio,
+            'low': low,
+            'high': high,
+            'status': status,
+            # ratios of medians of single programs, for the report only
+            'details': {
+                size: statistics.median(times) /
+                statistics.median(baseline_programs[size])
+                for size, times in programs.items()
+                if size in baseline_programs
+            },
+        })
+    return rows
+
+
+def print_report(rows: list[dict], threshold: float, confidence: float):
+    print(f'{"stage":>15} {"shape":>12} {"programs":>9} {"ratio":>6} '
+          f'{f"{confidence:.0%} interval":>15}  status')
+    for row in rows:
+        print(f'{row["stage"]:>15} {row["shape"]:>12} {row["programs"]:>9} '
+              f'{row["ratio"]:>6.2f} '
+              f'{row["low"]:>7.2f}..{row["high"]:<6.2f}  {row["status"]}')
+    slower = [row for row in rows if row['status'] == 'SLOWER']
+    print()
+    if not slower:
+        print(f'no stage is slower than baseline by more than '
+              f'{threshold:.0%} for any shape')
+        return
+    for row in slower:
+        print(f'{row["stage"]} of {row["shape"]} programs is '
+              f'x{row["ratio"]:.2f} of baseline time, at least '
+              f'x{row["low"]:.2f} with {confidence:.0%} confidence; '
+              f'by size:')
+        for size, ratio in sorted(row['details'].items()):
+            print(f'  {size}: x{ratio:.2f}')
+
+
+def run_suite(shapes: list[str], steps: int, repeat: int,
+              runs: int) -> list[dict]:
+    results = []
+    for number in range(runs):
+        print(f'run {number + 1} of {runs}', file=sys.stderr, flush=True)
+        results.append(suite.run(shapes, steps, repeat))
+    return results
+
+
+def main():
+    parser = ArgumentParser('Performance regression gate')
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH,
+                        help='baseline results (default: %(default)s)')
+    parser.add_argument('--results', type=Path, nargs='+',
+                        help='compare results of benchmarks.suite --json, '
+                             'one file per run, instead of running the '
+                             'suite')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='allowed slowdown, 0.1 is 10%% '
+                             '(default: %(default)s)')
+    parser.add_argument('--confidence', type=float, default=0.95,
+                        help='confidence level of intervals '
+                             '(default: %(default)s)')
+    parser.add_argument('--runs', type=int, default=9,
+                        help='runs of the whole suite (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='timed runs per stage and size in every run of '
+                             'the suite (default: %(default)s)')
+    parser.add_argument('--update', action='store_true',
+                        help='run the suite and store it as baseline')
+    parser.add_argument('--steps', type=int, default=3,
+                        help='sizes per shape of new baseline')
+    args = parser.parse_args()
+
+    if args.update:
+        runs = run_suite(list(SHAPES), args.steps, args.repeat, args.runs)
+        args.baseline.write_text(json.dumps({'runs': runs}, indent=2) + '\n')
+        print(f'baseline of {args.runs} runs written to {args.baseline}')
+        return 0
+
+    baseline = json.loads(args.baseline.read_text())['runs']
+    if args.results is not None:
+        current = [json.loads(path.read_text()) for path in args.results]
+    else:
+        # same programs as in baseline
+        current = run_suite(baseline[0]['shapes'], baseline[0]['steps'],
+                            args.repeat, args.runs)
+    rows = compare(current, baseline, args.threshold, args.confidence)
+    print_report(rows, args.threshold, args.confidence)
+    return 1 if any(row['status'] == 'SLOWER' for row in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""
+Lexer throughput on growing inputs. Time per byte should stay flat.
+
+    python -m benchmarks.lexer
+"""
+import time
+from argparse import ArgumentParser
+from transpiler.lexer import Lexer
+from transpiler.settings import Tag, LEXER_RULES
+
+
+BLOCK = """
+var a{0}: integer := ({0} + 2) * 3 - 4;
+if a{0} > 1 then
+    println('a{0} > 1');  // comment
+{{ multi line
+  comment }}
+"""
+
+
+def generate(size: int) -> str:
+    blocks = []
+    length = 0
+    idx = 0
+    while length < size:
+        block = BLOCK.format(idx)
+        blocks.append(block)
+        length += len(block)
+        idx += 1
+    return ''.join(blocks)
+
+
+def measure(code: str) -> tuple[int, float]:
+    lexer = Lexer(Tag, LEXER_RULES)
+    lexer.buffer = code
+    start = time.perf_counter()
+    count = sum(1 for _ in lexer.tokens)
+    return count, time.perf_counter() - start
+
+
+def main():
+    parser = ArgumentParser('Lexer benchmark')
+    parser.add_argument('--max-size', type=int, default=4 * 1024 * 1024,
+                        help='largest input size in bytes')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs per size, the fastest one is reported')
+    args = parser.parse_args()
+
+    print(f'{"bytes":>10} {"tokens":>9} {"seconds":>9} '
+          f'{"tokens/s":>10} {"ns/byte":>8}')
+    size = 64 * 1024
+    while size <= args.max_size:
+        code = generate(size)
+        count, elapsed = min(
+            (measure(code) for _ in range(args.repeat)),
+            key=lambda result: result[1],
+        )
+        print(f'{len(code):>10} {count:>9} {elapsed:>9.3f} '
+              f'{count / elapsed:>10.0f} {elapsed / len(code) * 1e9:>8.1f}')
+        size *= 2
+
+
+if __name__ == '__main__':
+    main()
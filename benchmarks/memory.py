@@ -0,0 +1,48 @@
+"""
+Memory held by the parse tree, in bytes per source token.
+
+    python -m benchmarks.memory
+"""
+import gc
+import tracemalloc
+from argparse import ArgumentParser
+from transpiler.lexer import Lexer
+from transpiler.syntax_analyzer import SyntaxAnalyzer
+from transpiler.settings import Tag, LEXER_RULES, GRAMMAR_RULES
+from benchmarks.programs import flat_program
+
+
+def measure(syntax_analyzer: SyntaxAnalyzer, code: str) -> tuple[int, int]:
+    lexer = Lexer(Tag, LEXER_RULES)
+    lexer.buffer = code
+    count = sum(1 for _ in lexer.tokens)
+
+    lexer.buffer = code
+    gc.collect()
+    tracemalloc.start()
+    tree = syntax_analyzer.parse(lexer.tokens)
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tree
+    return count, size
+
+
+def main():
+    parser = ArgumentParser('Parse tree memory benchmark')
+    parser.add_argument('--max-size', type=int, default=8000,
+                        help='largest number of statements')
+    args = parser.parse_args()
+
+    syntax_analyzer = SyntaxAnalyzer(GRAMMAR_RULES)
+    print(f'{"size":>7} {"tokens":>8} {"bytes":>11} {"bytes/token":>12}')
+    size = 500
+    while size <= args.max_size:
+        count, allocated = measure(syntax_analyzer, flat_program(size))
+        print(f'{size:>7} {count:>8} {allocated:>11} '
+              f'{allocated / count:>12.1f}')
+        size *= 2
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+SyntaxAnalyzer.parse on long and deeply nested programs.
+
+    python -m benchmarks.parser
+"""
+import time
+from argparse import ArgumentParser
+from transpiler.lexer import Lexer
+from transpiler.syntax_analyzer import SyntaxAnalyzer
+from transpiler.settings import Tag, LEXER_RULES, GRAMMAR_RULES
+from benchmarks.programs import flat_program, nested_program
+
+
+def measure(syntax_analyzer: SyntaxAnalyzer, code: str,
+            repeat: int) -> tuple[int, float]:
+    lexer = Lexer(Tag, LEXER_RULES)
+    lexer.buffer = code
+    tokens = list(lexer.tokens)
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        syntax_analyzer.parse(iter(tokens))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(tokens), best
+
+
+def main():
+    parser = ArgumentParser('Parser benchmark')
+    parser.add_argument('--max-size', type=int, default=8000,
+                        help='largest number of statements or nesting depth')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs per size, the fastest one is reported')
+    args = parser.parse_args()
+
+    syntax_analyzer = SyntaxAnalyzer(GRAMMAR_RULES)
+    print(f'{"program":>8} {"size":>7} {"tokens":>8} {"seconds":>9} '
+          f'{"tokens/s":>10}')
+    for name, generate in (('flat', flat_program),
+                           ('nested', nested_program)):
+        size = 500
+        while size <= args.max_size:
+            count, elapsed = measure(syntax_analyzer, generate(size),
+                                     args.repeat)
+            print(f'{name:>8} {size:>7} {count:>8} {elapsed:>9.3f} '
+                  f'{count / elapsed:>10.0f}')
+            size *= 2
+
+
+if __name__ == '__main__':
+    main()
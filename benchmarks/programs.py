@@ -0,0 +1,147 @@
+"""
+Synthetic Pascal programs for benchmarks.
+"""
+
+
+def flat_program(statements: int) -> str:
+    lines = ['var total: integer := 0;', 'begin']
+    for idx in range(statements):
+        lines.append(f'    var v{idx}: integer := {idx} + total * 2;')
+        lines.append(f"    writeln('value', v{idx});")
+    lines.append('end.')
+    return '\n'.join(lines) + '\n'
+
+
+def nested_program(depth: int, statements: int = 1) -> str:
+    lines = ['var total: integer := 0;', 'begin']
+    for level in range(depth):
+        indent = '    ' * (level + 1)
+        lines.append(f'{indent}if total < {level} then')
+        lines.append(f'{indent}begin')
+        for idx in range(statements):
+            lines.append(f'{indent}    total := total + {idx};')
+    for level in reversed(range(depth)):
+        indent = '    ' * (level + 1)
+        lines.append(f'{indent}end;')
+    lines.append('end.')
+    return '\n'.join(lines) + '\n'
+
+
+def nested_call_program(depth: int) -> str:
+    expr = 'total'
+    for idx in range(depth):
+        expr = f'f{idx % 3}({expr}, {idx})'
+    return f'var total: integer := 0;\nbegin\n    total := {expr};\nend.\n'
+
+
+def nested_loops_program(depth: int, variables: int = 8) -> str:
+    lines = ['var total: integer := 0;', 'begin']
+    for level in range(depth):
+        indent = '    ' * (level + 1)
+        lines.append(f'{indent}for var i{level}: integer := 0 to 10 do')
+        lines.append(f'{indent}begin')
+        for idx in range(variables):
+            lines.append(f'{indent}    var v{level}_{idx}: integer := '
+                         f'total + i{level} + {idx};')
+        refs = ' + '.join(f'v{level}_{idx}' for idx in range(variables))
+        lines.append(f'{indent}    total := total + {refs};')
+    for level in reversed(range(depth)):
+        indent = '    ' * (level + 1)
+        lines.append(f'{indent}end;')
+    lines.append('end.')
+    return '\n'.join(lines) + '\n'
+
+
+def string_program(statements: int, words: int = 20) -> str:
+    text = ' '.join(f'word{idx}' for idx in range(words))
+    lines = ["var s: string := '';", 'begin']
+    for idx in range(statements):
+        lines.append(f"    s := '{text}';")
+        lines.append(f"    writeln('{idx}: ', s, ' {text}');")
+    lines.append('end.')
+    return '\n'.join(lines) + '\n'
+
+
+def globals_program(count: int) -> str:
+    types = [('integer', '{}'), ('real', '{}.5'), ('char', "'c'"),
+             ('string', "'s{}'"), ('boolean', 'true')]
+    lines = []
+    for idx in range(count):
+        var_type, value = types[idx % len(types)]
+        lines.append(f'var g{idx}: {var_type} := {value.format(idx)};')
+    lines.append('begin')
+    for idx in range(0, count, len(types)):
+        lines.append(f'    g{idx} := g{idx} + 1;')
+    lines.append('end.')
+    return '\n'.join(lines) + '\n'
+
+
+def nested_blocks_program(depth: int) -> str:
+    """
+    if, for, while and repeat nested in turn.
+    """
+    lines = ['var total: integer := 0;', 'begin']
+    closing = []
+    for level in range(depth):
+        indent = '    ' * (level + 1)
+        kind = level % 4
+        if kind == 0:
+            lines.append(f'{indent}if total < {level} then')
+        elif kind == 1:
+            lines.append(f'{indent}for var i{level}: integer := 0 to 10 do')
+        elif kind == 2:
+            lines.append(f'{indent}while total < {level} do')
+        if kind == 3:
+            lines.append(f'{indent}repeat')
+            closing.append(f'{indent}until total > {level};')
+        else:
+            lines.append(f'{indent}begin')
+            closing.append(f'{indent}end;')
+        lines.append(f'{indent}    total := total + {level};')
+    lines.extend(reversed(closing))
+    lines.append('end.')
+    return '\n'.join(lines) + '\n'
+
+
+def expression_program(terms: int, statements: int = 4) -> str:
+    parts = ['total']
+    for idx in range(1, terms):
+        if idx % 3 == 0:
+            parts.append(f'- ({idx} + total)')
+        elif idx % 3 == 1:
+            parts.append(f'+ total * {idx}')
+        else:
+            parts.append(f'+ {idx}')
+    expr = ' '.join(parts)
+    lines = ['var total: integer := 0;', 'begin']
+    for idx in range(statements):
+        lines.append(f'    var e{idx}: integer := {expr};')
+    lines.append('end.')
+    return '\n'.join(lines) + '\n'
+
+
+def long_string_program(length: int, statements: int = 4) -> str:
+    text = ('lorem ipsum ' * (length // 12 + 1))[:length]
+    lines = ["var s: string := '';", 'begin']
+    for idx in range(statements):
+        lines.append(f"    s := '{idx} {text}';")
+    lines.append('end.')
+    return '\n'.join(lines) + '\n'
+
+
+def writeln_program(calls: int) -> str:
+    lines = ['var total: integer := 0;', "var c: char := 'c';", 'begin']
+    for idx in range(calls):
+        lines.append(f"    writeln('line {idx}: ', total + {idx}, c);")
+    lines.append('end.')
+    return '\n'.join(lines) + '\n'
+
+
+# shape name -> (generator, smallest size) for benchmarks.suite
+SHAPES = {
+    'globals': (globals_program, 64),
+    'nested': (nested_blocks_program, 8),
+    'expressions': (expression_program, 64),
+    'strings': (long_string_program, 1024),
+    'writeln': (writeln_program, 64),
+}
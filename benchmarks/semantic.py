@@ -0,0 +1,55 @@
+"""
+SemanticAnalyzer.parse on long programs and on deeply nested calls.
+
+Time per token should stay flat as programs grow.
+
+    python -m benchmarks.semantic
+"""
+import time
+from argparse import ArgumentParser
+from transpiler.lexer import Lexer
+from transpiler.syntax_analyzer import SyntaxAnalyzer
+from transpiler.semantic_analyzer import SemanticAnalyzer
+from transpiler.settings import Tag, LEXER_RULES, GRAMMAR_RULES
+from benchmarks.programs import flat_program, nested_call_program
+
+
+def measure(syntax_analyzer: SyntaxAnalyzer, code: str,
+            repeat: int) -> tuple[int, float]:
+    lexer = Lexer(Tag, LEXER_RULES)
+    lexer.buffer = code
+    tokens = list(lexer.tokens)
+    tree = syntax_analyzer.parse(iter(tokens))
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        SemanticAnalyzer(tree, code).parse()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(tokens), best
+
+
+def main():
+    parser = ArgumentParser('Semantic analyzer benchmark')
+    parser.add_argument('--max-size', type=int, default=512,
+                        help='largest number of statements or call depth')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs per size, the fastest one is reported')
+    args = parser.parse_args()
+
+    syntax_analyzer = SyntaxAnalyzer(GRAMMAR_RULES)
+    print(f'{"program":>8} {"size":>7} {"tokens":>8} {"seconds":>9} '
+          f'{"us/token":>9}')
+    for name, generate in (('flat', flat_program),
+                           ('calls', nested_call_program)):
+        size = 16
+        while size <= args.max_size:
+            count, elapsed = measure(syntax_analyzer, generate(size),
+                                     args.repeat)
+            print(f'{name:>8} {size:>7} {count:>8} {elapsed:>9.3f} '
+                  f'{elapsed / count * 1e6:>9.1f}')
+            size *= 2
+
+
+if __name__ == '__main__':
+    main()
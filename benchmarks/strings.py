@@ -0,0 +1,55 @@
+"""
+End-to-end transpilation of string-heavy programs, with size of parse
+tree and of predict table.
+
+    python -m benchmarks.strings
+"""
+import time
+from argparse import ArgumentParser
+from transpiler import Transpiler
+from transpiler.lexer import Lexer
+from transpiler.settings import Tag, LEXER_RULES
+from benchmarks.programs import string_program
+
+
+def measure(transpiler: Transpiler, code: str,
+            repeat: int) -> tuple[int, int, float]:
+    lexer = Lexer(Tag, LEXER_RULES)
+    lexer.buffer = code
+    tokens = list(lexer.tokens)
+    nodes = transpiler.syntax_analyzer.parse(iter(tokens)).count_nodes()
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        transpiler.transpile(code)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(tokens), nodes, best
+
+
+def main():
+    parser = ArgumentParser('String literals benchmark')
+    parser.add_argument('--max-size', type=int, default=2000,
+                        help='largest number of statements')
+    parser.add_argument('--words', type=int, default=20,
+                        help='words in every string literal')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs per size, the fastest one is reported')
+    args = parser.parse_args()
+
+    transpiler = Transpiler()
+    predict_table = transpiler.syntax_analyzer._predict_table
+    print(f'predict table: {sum(map(len, predict_table.values()))} entries')
+    print(f'{"size":>7} {"tokens":>8} {"nodes":>8} {"seconds":>9} '
+          f'{"us/byte":>8}')
+    size = 125
+    while size <= args.max_size:
+        code = string_program(size, args.words)
+        tokens, nodes, elapsed = measure(transpiler, code, args.repeat)
+        print(f'{size:>7} {tokens:>8} {nodes:>8} {elapsed:>9.3f} '
+              f'{elapsed / len(code) * 1e6:>8.2f}')
+        size *= 2
+
+
+if __name__ == '__main__':
+    main()
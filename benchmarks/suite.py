@@ -0,0 +1,192 @@
+"""
+Every pipeline stage on synthetic programs of every shape and growing
+size, reported as a text table and optionally as JSON.
+
+Stages are timed separately: Lexer.tokens, SyntaxAnalyzer construction
+(building grammar from scratch and loading it from cache),
+SyntaxAnalyzer.parse, SemanticAnalyzer.parse and end-to-end transpile().
+For every shape, exponent of time against size shows how stages scale.
+
+    python -m benchmarks.suite --json results.json
+"""
+import json
+import math
+import platform
+import statistics
+import tempfile
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+from transpiler import Transpiler
+from transpiler.lexer import Lexer
+from transpiler.syntax_analyzer import SyntaxAnalyzer
+from transpiler.semantic_analyzer import SemanticAnalyzer
+from transpiler.settings import Tag, LEXER_RULES, GRAMMAR_RULES
+from benchmarks.programs import SHAPES
+
+
+PROGRAM_STAGES = ('lexer', 'parse', 'semantic', 'transpile')
+
+
+def sample(func, repeat: int) -> list[float]:
+    """
+    Seconds of every one of repeat calls of func, after a warm-up call.
+    """
+    func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def summarize(samples: list[float]) -> dict:
+    return {
+        'median': statistics.median(samples),
+        'min': min(samples),
+        'samples': samples,
+    }
+
+
+def measure_construction(repeat: int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        cache_path = Path(directory) / 'grammar_cache.json'
+        SyntaxAnalyzer(GRAMMAR_RULES, cache_path=cache_path)
+        return {
+            'build': summarize(sample(
+                lambda: SyntaxAnalyzer(GRAMMAR_RULES), repeat
+            )),
+            'load': summarize(sample(
+                lambda: SyntaxAnalyzer(GRAMMAR_RULES, cache_path=cache_path),
+                repeat,
+            )),
+        }
+
+
+def tokenize(lexer: Lexer, code: str) -> list:
+    lexer.buffer = code
+    return list(lexer.tokens)
+
+
+def measure_program(transpiler: Transpiler, code: str, repeat: int) -> dict:
+    lexer = Lexer(Tag, LEXER_RULES)
+    tokens = tokenize(lexer, code)
+    syntax_analyzer = transpiler.syntax_analyzer
+    tree = syntax_analyzer.parse(iter(tokens))
+    stages = {
+        'lexer': lambda: tokenize(lexer, code),
+        'parse': lambda: syntax_analyzer.parse(iter(tokens)),
+        'semantic': lambda: SemanticAnalyzer(tree, code).parse(),
+        'transpile': lambda: transpiler.transpile(code),
+    }
+    return {
+        'bytes': len(code.encode()),
+        'tokens': len(tokens),
+        'nodes': tree.count_nodes(),
+        'stages': {
+            stage: summarize(sample(func, repeat))
+            for stage, func in stages.items()
+        },
+    }
+
+
+def scaling(programs: list[dict]) -> dict:
+    """
+    Exponent k of time ~ size ** k for every shape and stage, fitted by
+    least squares on logarithms. About 1 means linear scaling.
+    """
+    by_shape = {}
+    for program in programs:
+        by_shape.setdefault(program['shape'], []).append(program)
+    exponents = {}
+    for shape, runs in by_shape.items():
+        if len(runs) < 2:
+            continue
+        sizes = [math.log(run['size']) for run in runs]
+        exponents[shape] = {}
+        for stage in PROGRAM_STAGES:
+            times = [math.log(run['stages'][stage]['median']) for run in runs]
+            mean_size = statistics.fmean(sizes)
+            mean_time = statistics.fmean(times)
+            exponents[shape][stage] = sum(
+                (x - mean_size) * (y - mean_time)
+                for x, y in zip(sizes, times)
+            ) / sum((x - mean_size) ** 2 for x in sizes)
+    return exponents
+
+
+def run(shapes: list[str], steps: int, repeat: int) -> dict:
+    transpiler = Transpiler()
+    programs = []
+    for shape in shapes:
+        generate, size = SHAPES[shape]
+        for _ in range(steps):
+            programs.append({
+                'shape': shape,
+                'size': size,
+                **measure_program(transpiler, generate(size), repeat),
+            })
+            size *= 2
+    return {
+        'python': platform.python_version(),
+        'shapes': shapes,
+        'steps': steps,
+        'repeat': repeat,
+        'construction': measure_construction(repeat),
+        'programs': programs,
+        'scaling': scaling(programs),
+    }
+
+
+def print_table(results: dict):
+    for name, stats in results['construction'].items():
+        print(f'grammar {name}: {stats["median"] * 1000:.1f} ms')
+    print()
+    header = ''.join(f' {stage + ", ms":>13}' for stage in PROGRAM_STAGES)
+    print(f'{"shape":>12} {"size":>6} {"tokens":>7}{header} '
+          f'{"tokens/s":>10} {"KiB/s":>8}')
+    for program in results['programs']:
+        stages = program['stages']
+        row = ''.join(
+            f' {stages[stage]["median"] * 1000:>13.2f}'
+            for stage in PROGRAM_STAGES
+        )
+        seconds = stages['transpile']['median']
+        print(f'{program["shape"]:>12} {program["size"]:>6} '
+              f'{program["tokens"]:>7}{row} '
+              f'{program["tokens"] / seconds:>10.0f} '
+              f'{program["bytes"] / seconds / 1024:>8.0f}')
+
+    if results['scaling']:
+        print('\nscaling, k of time ~ size ** k')
+        header = ''.join(f' {stage:>13}' for stage in PROGRAM_STAGES)
+        print(f'{"shape":>12}{header}')
+        for shape, exponents in results['scaling'].items():
+            row = ''.join(
+                f' {exponents[stage]:>13.2f}' for stage in PROGRAM_STAGES
+            )
+            print(f'{shape:>12}{row}')
+
+
+def main():
+    parser = ArgumentParser('Benchmark suite')
+    parser.add_argument('--shapes', nargs='+', choices=list(SHAPES),
+                        default=list(SHAPES),
+                        help='program shapes to run')
+    parser.add_argument('--steps', type=int, default=4,
+                        help='sizes per shape, each twice the previous one')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='timed runs per stage and size')
+    parser.add_argument('--json', type=Path,
+                        help='also write results to this file')
+    args = parser.parse_args()
+
+    results = run(args.shapes, args.steps, args.repeat)
+    print_table(results)
+    if args.json is not None:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+SemanticAnalyzer.parse on deeply nested loops which declare and reference
+many variables, so most of the time goes to variable lookups.
+
+Lookups alone are measured on a SymbolTable filled the same way, resolving
+global and innermost names, and should not depend on depth.
+
+    python -m benchmarks.symbols
+"""
+import time
+from argparse import ArgumentParser
+from transpiler.symbol_table import SymbolTable
+from transpiler.syntax_analyzer import SyntaxAnalyzer
+from transpiler.settings import GRAMMAR_RULES
+from benchmarks.programs import nested_loops_program
+from benchmarks.semantic import measure
+
+
+def measure_lookups(depth: int, variables: int, repeat: int,
+                    lookups: int = 100000) -> float:
+    symbol_table = SymbolTable()
+    symbol_table.declare('total', 'integer', [])
+    for level in range(depth):
+        symbol_table.push_scope()
+        for idx in range(variables):
+            symbol_table.declare(f'v{level}_{idx}', 'integer', [])
+    names = ['total', f'v{depth - 1}_0'] * (lookups // 2)
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for name in names:
+            symbol_table.get_type(name)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(names)
+
+
+def main():
+    parser = ArgumentParser('Symbol table benchmark')
+    parser.add_argument('--max-depth', type=int, default=256,
+                        help='largest nesting depth of loops')
+    parser.add_argument('--variables', type=int, default=8,
+                        help='variables declared in every loop')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs per depth, the fastest one is reported')
+    args = parser.parse_args()
+
+    syntax_analyzer = SyntaxAnalyzer(GRAMMAR_RULES)
+    print(f'{"depth":>7} {"tokens":>8} {"seconds":>9} {"us/token":>9} '
+          f'{"ns/lookup":>10}')
+    depth = 16
+    while depth <= args.max_depth:
+        code = nested_loops_program(depth, args.variables)
+        count, elapsed = measure(syntax_analyzer, code, args.repeat)
+        lookup = measure_lookups(depth, args.variables, args.repeat)
+        print(f'{depth:>7} {count:>8} {elapsed:>9.3f} '
+              f'{elapsed / count * 1e6:>9.1f} {lookup * 1e9:>10.1f}')
+        depth *= 2
+
+
+if __name__ == '__main__':
+    main()
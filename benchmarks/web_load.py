@@ -0,0 +1,169 @@
+"""
+Latency of small /transpile requests, alone and while large programs are
+transpiled concurrently. Starts its own server unless --url is given.
+
+Every request sends a distinct source, so results are not taken from
+the result cache of the server and every request is transpiled.
+
+    python -m benchmarks.web_load
+"""
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.programs import flat_program
+
+
+SMALL_PROGRAM = flat_program(5)
+
+# next() of itertools.count is atomic, so numbers are unique across threads
+request_numbers = itertools.count()
+
+
+def unique(code: str) -> dict:
+    return {'code': f'{code}// {next(request_numbers)}\n'}
+
+
+def post(url: str, path: str, payload) -> tuple[int, float]:
+    request = urllib.request.Request(
+        url + path,
+        json.dumps(payload).encode(),
+        {'Content-Type': 'application/json'},
+    )
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as error:
+        status = error.code
+    return status, time.perf_counter() - start
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def run_small(url: str, requests: int, concurrency: int) -> list[tuple]:
+    with ThreadPoolExecutor(concurrency) as executor:
+        return list(executor.map(
+            lambda _: post(url, '/transpile', unique(SMALL_PROGRAM)),
+            range(requests),
+        ))
+
+
+def run_large(url: str, code: str, stop: threading.Event, done: list):
+    while not stop.is_set():
+        done.append(post(url, '/transpile', unique(code)))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, workers: int,
+                 small_workers: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        'TRANSPILE_WORKERS': str(workers),
+        'TRANSPILE_SMALL_WORKERS': str(small_workers),
+    }
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'web.app:app',
+         '--port', str(port), '--log-level', 'warning'],
+        env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/').read()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError('server did not start')
+
+
+def report(name: str, results: list[tuple]):
+    latencies = [elapsed for status, elapsed in results if status == 200]
+    rejected = sum(status == 503 for status, _ in results)
+    if latencies:
+        times = ''.join(
+            f' {percentile(latencies, fraction) * 1000:>8.1f}'
+            for fraction in (0.5, 0.99)
+        )
+    else:
+        # every request was rejected or failed
+        times = f' {"-":>8} {"-":>8}'
+    print(f'{name:>8} {len(results):>9} {rejected:>6}{times}')
+
+
+def main():
+    parser = ArgumentParser('Web load test')
+    parser.add_argument('--url', help='running server, e.g. '
+                        'http://127.0.0.1:8000, by default one is started')
+    parser.add_argument('--workers', type=int, default=2,
+                        help='TRANSPILE_WORKERS of started server')
+    parser.add_argument('--small-workers', type=int, default=1,
+                        help='TRANSPILE_SMALL_WORKERS of started server, '
+                             '0 to let large programs take every worker')
+    parser.add_argument('--requests', type=int, default=300,
+                        help='small requests per phase')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='concurrent small requests')
+    parser.add_argument('--large-clients', type=int, default=2,
+                        help='clients sending large programs in a loop')
+    parser.add_argument('--large-size', type=int, default=1000,
+                        help='statements in large programs')
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        port = free_port()
+        server = start_server(port, args.workers, args.small_workers)
+        url = f'http://127.0.0.1:{port}'
+
+    try:
+        print(f'{"phase":>8} {"requests":>9} {"503":>6} '
+              f'{"p50, ms":>8} {"p99, ms":>8}')
+        report('idle', run_small(url, args.requests, args.concurrency))
+
+        stop = threading.Event()
+        large = []
+        clients = [
+            threading.Thread(
+                target=run_large,
+                args=(url, flat_program(args.large_size), stop, large),
+            )
+            for _ in range(args.large_clients)
+        ]
+        for client in clients:
+            client.start()
+        try:
+            loaded = run_small(url, args.requests, args.concurrency)
+        finally:
+            stop.set()
+            for client in clients:
+                client.join()
+        report('loaded', loaded)
+        report('large', large)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
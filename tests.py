@@ -1,5 +1,17 @@
+import asyncio
+import contextlib
+import gzip
+import io
+import json
 import logging
-from unittest import TestCase
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest import TestCase, mock, skipUnless
 from transpiler.base import (
     Token,
     GrammarRule,
@@ -12,8 +24,45 @@ from transpiler.base import (
 )
 from transpiler.lexer import Lexer, UnexpectedTokenError
 from transpiler.syntax_analyzer import GrammarError, SyntaxAnalyzer
-from transpiler.semantic_analyzer import SemanticAnalyzer, SemanticError
-from transpiler import settings, transpile
+from transpiler.semantic_analyzer import (
+    SemanticAnalyzer,
+    SemanticError,
+    ExpressionEvaluator,
+    PascalAnyComparable,
+    PascalInt,
+    PascalString,
+)
+from transpiler.symbol_table import SymbolTable
+from transpiler.stats import PipelineStats
+from transpiler.build_cache import BuildCache
+from transpiler import settings, transpile, Transpiler, grammar_cache, cli
+from transpiler import watch
+
+try:
+    from web.cache import ResultCache, source_key
+    from fastapi import HTTPException, Request, WebSocketDisconnect, status
+    from web import metrics
+    from web.assets import IMMUTABLE, REVALIDATE, StaticAssets
+    from web.app import (
+        assets,
+        cache as app_cache,
+        get_static,
+        get_transpiled,
+        get_transpiled_batch,
+    )
+    from web.live import LiveSession
+    from web.pool import (
+        PoolSaturatedError,
+        TranspilePool,
+        WorkerLostResult,
+        run_transpile_many,
+    )
+    from web.schemas import Batch, Code
+    from web.schemas import TranspileResult
+    WEB_INSTALLED = True
+except ImportError:
+    # dependencies of requirements-web.txt are not installed
+    WEB_INSTALLED = False
 
 
 logger = logging.getLogger(__name__)
@@ -262,6 +311,33 @@ class LexerTestCase(TestCase):
             list(lexer.tokens)
         self.assertEqual(str(error.exception), r"% at line 2")
 
+    def test_empty_buffer(self):
+        lexer = Lexer(Tag, LEXER_RULES)
+        for code in ('', ' \n\t', '// only comment\n'):
+            lexer.buffer = code
+            tokens = list(lexer.tokens)
+            self.assertEqual(len(tokens), 1)
+            self.assertIs(tokens[0].tag, Special.LIMITER)
+
+    def test_line_and_column(self):
+        code = "begin\n  // comment\n  var1 := 1;{\n}  end."
+        lexer = Lexer(Tag, LEXER_RULES)
+        lexer.buffer = code
+        positions = [
+            (token.value, token.line, token.column)
+            for token in lexer.tokens
+        ]
+        self.assertListEqual(positions, [
+            ('begin', 1, 1),
+            ('var1', 3, 3),
+            (':=', 3, 8),
+            ('1', 3, 11),
+            (';', 3, 12),
+            ('end', 4, 4),
+            ('.', 4, 7),
+            (Special.LIMITER.value, -1, -1),
+        ])
+
     def test_types(self):
         code = """
             var
@@ -578,7 +654,62 @@ class SyntaxAnalyzerTestCase(TestCase):
             yield Token(MathTerminal.NUM, '3', 0, 1)
             yield Token(Special.LIMITER, Special.LIMITER.value)
 
-        sa.parse(tokens())
+        tree = sa.parse(tokens())
+        self.assertListEqual(
+            [child.tag for child in tree.root.children],
+            [MathNonTerminal.T, MathNonTerminal._E],
+        )
+        self.assertListEqual(
+            [child.tag for child in tree.root.children[1].children],
+            [MathTerminal.PLUS, MathNonTerminal.T, MathNonTerminal._E],
+        )
+
+    def test_grammar_cache(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache_path = Path(tmp_dir) / 'grammar_cache.json'
+            built = SyntaxAnalyzer(self.math_expression_rules,
+                                   cache_path=cache_path)
+            self.assertTrue(cache_path.exists())
+
+            loaded = SyntaxAnalyzer(self.math_expression_rules)
+            self.assertTrue(loaded.load(cache_path))
+            self.assertDictEqual(loaded._first, built._first)
+            self.assertDictEqual(loaded._follow, built._follow)
+            self.assertDictEqual(loaded._predict_table, built._predict_table)
+
+            # cache built for another grammar is ignored and rewritten
+            sa = SyntaxAnalyzer(self.simple_rules, cache_path=cache_path)
+            self.assertFalse(
+                SyntaxAnalyzer(self.math_expression_rules).load(cache_path)
+            )
+            self.assertTrue(sa.load(cache_path))
+
+            cache_path.write_text('{')
+            self.assertFalse(sa.load(cache_path))
+            SyntaxAnalyzer(self.simple_rules, cache_path=cache_path)
+            data = json.loads(cache_path.read_text())
+            self.assertEqual(data['fingerprint'],
+                             grammar_cache.fingerprint(self.simple_rules))
+
+    def test_shared_placeholder_tokens(self):
+        sa = SyntaxAnalyzer(self.math_expression_rules)
+
+        def tokens():
+            yield Token(MathTerminal.NUM, '1', 0, 1)
+            yield Token(MathTerminal.PLUS, '+', 0, 1)
+            yield Token(MathTerminal.NUM, '2', 0, 1)
+            yield Token(Special.LIMITER, Special.LIMITER.value)
+
+        tree = sa.parse(tokens())
+        first_t, right_e = tree.root.children
+        second_t = right_e.children[1]
+        self.assertIs(first_t.token, second_t.token)
+        self.assertEqual(first_t.token.value, MathNonTerminal.T.value)
+
+        first_num = first_t.children[0].children[0]
+        second_num = second_t.children[0].children[0]
+        self.assertEqual(first_num.token.value, '1')
+        self.assertEqual(second_num.token.value, '2')
 
     def test_first_set_simple_rules(self):
         sa = SyntaxAnalyzer(self.simple_rules)
@@ -986,6 +1117,29 @@ class WorkingGrammarTestCase(TestCase):
             end.
         """)
 
+    def test_boolean_operators(self):
+        self.check_not_fails("""
+            var a: boolean;
+            begin
+                a := TRUE AND false;
+                a := true xor (1 > 2);
+                a := NOT (a) or a;
+            end.
+        """)
+
+        self.check_fails("""
+            begin
+                var a: boolean := true xor 1;
+            end.
+        """, msg='true at line 3 - expression is not compatible with type '
+                 'boolean')
+
+        self.check_fails("""
+            begin
+                var a: boolean := true and b;
+            end.
+        """, msg='b at line 3 - variable is not defined')
+
     def test_string(self):
         self.check_fails("""
             begin
@@ -2477,6 +2631,931 @@ class WorkingGrammarTestCase(TestCase):
         """)
 
 
+class TranspilerTestCase(TestCase):
+    code = """
+        var a: integer := 1;
+        begin
+            a := a + 1;
+            print(a);
+        end.
+    """
+
+    def test_reusable(self):
+        transpiler = Transpiler()
+        first = transpiler.transpile(self.code)
+        self.assertEqual(first, transpiler.transpile(self.code))
+        self.assertEqual(first, transpile(self.code))
+
+    def test_concurrent(self):
+        # same names of different types, so checkers sharing state
+        # between calls would look variables up in another program
+        sums = ' + '.join(['a'] * 20)
+        ones = ' + '.join(['1'] * 20)
+        programs = [
+            f'var a: integer := 1; begin var b: integer := {sums}; end.',
+            f'var a: real := 1.5; begin var b: integer := {ones}; end.',
+            f"var a: string := 'a'; begin var b: string := {sums}; end.",
+            """
+            var r: real := 1.5;
+            begin
+                for var i: integer := 1 to 10 do
+                    while (r < 10) and (i > 2) do
+                        r := r * 2 + abs(r);
+            end.
+            """,
+            'begin var a: integer := 1.5; end.',
+        ]
+
+        def run(code):
+            try:
+                return transpile(code)
+            except TranspilerError as error:
+                return str(error)
+
+        expected = [run(code) for code in programs]
+        jobs = programs * 200
+
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                results = list(executor.map(run, jobs))
+        finally:
+            sys.setswitchinterval(switch_interval)
+        mismatches = [
+            result for result, expected_result
+            in zip(results, expected * 200) if result != expected_result
+        ]
+        self.assertEqual(mismatches, [])
+
+    def test_string_literals(self):
+        result = transpile(r"""
+            var c: char := '''';
+            begin
+                writeln('it''s "quoted" \ // not a comment {x}', c);
+            end.
+        """)
+        self.assertIn(r"static char c = '\'';", result)
+        self.assertIn(
+            r'''Console.WriteLine("it's \"quoted\" \\ // '''
+            r'''not a comment {x}", c);''',
+            result
+        )
+
+        with self.assertRaises(UnexpectedTokenError) as error:
+            transpile("begin\nwriteln('abc);\nend.")
+        self.assertEqual(str(error.exception), "' at line 2")
+
+    def test_output_stream(self):
+        output = io.StringIO()
+        self.assertIsNone(transpile(self.code, output=output))
+        self.assertEqual(output.getvalue(), transpile(self.code))
+
+        output = io.StringIO()
+        with self.assertRaises(SemanticError):
+            transpile('begin b := 1; end.', output=output)
+        self.assertEqual(output.getvalue(), '')
+
+    def test_filepath_in_errors(self):
+        transpiler = Transpiler()
+        with self.assertRaises(SemanticError) as error:
+            transpiler.transpile('begin b := 1; end.', 'main.pas')
+        self.assertEqual(
+            str(error.exception),
+            'b at line 1 - variable is not defined (main.pas:1)'
+        )
+        self.assertIsNone(transpiler.syntax_analyzer.filepath)
+        self.assertIsNone(transpiler.lexer.filepath)
+
+    def test_long_program(self):
+        statements = 3000
+        words = ' '.join(['word'] * 3000)
+        code = 'var a: integer := 0;\nbegin\n'
+        code += 'a := a + 1;\n' * statements
+        code += f"print('{words}');\nend."
+
+        result = transpile(code)
+        self.assertEqual(result.count('a = a + 1;'), statements)
+        self.assertIn(f'Console.Write("{words}");', result)
+
+    def test_nested_calls(self):
+        expr = 'a'
+        for _ in range(200):
+            expr = f'f({expr}, 1)'
+        result = transpile(f'var a: integer := 0;\nbegin\na := {expr};\nend.')
+        self.assertIn(f'a = {expr};', result)
+
+        with self.assertRaises(SemanticError) as error:
+            transpile(f'begin\nvar a: integer := {expr};\nend.')
+        self.assertEqual(str(error.exception),
+                         'a at line 2 - variable is not defined')
+
+    def test_call_in_for_loop(self):
+        result = transpile(
+            'var i: integer := 1;\nbegin\n'
+            'for var j: integer := abs(i) to i + 10 do writeln(j);\nend.'
+        )
+        self.assertIn('for (int j = Math.Abs(i); j <= i + 10; j++)', result)
+
+    def test_trace(self):
+        with self.assertRaises(TranspilerError) as error:
+            Transpiler().transpile('begin a := ; end.')
+        self.assertIsNone(error.exception.trace)
+
+        with self.assertRaises(TranspilerError) as error:
+            Transpiler(trace_size=3).transpile('begin a := ; end.')
+        self.assertEqual(error.exception.trace, '\n'.join([
+            'rule ANY_ASSIGN -> (assign,)',
+            "match assign ':=' at 1:9",
+            "lex semicolon ';' at 1:12",
+        ]))
+
+    def test_stats(self):
+        code = "var a: integer := 1;\nbegin\nvar s: string := 'Ы';\nend."
+        stats = PipelineStats()
+        result = transpile(code, stats=stats)
+        self.assertEqual(set(stats.seconds), set(PipelineStats.STAGES))
+        self.assertEqual(stats.tokens, 18)
+        self.assertGreater(stats.nodes, stats.tokens)
+        self.assertEqual(stats.variables, 2)
+        self.assertEqual(stats.output_bytes, len(result.encode()))
+
+        streamed = PipelineStats()
+        transpile(code, output=io.StringIO(), stats=streamed)
+        self.assertEqual(streamed.output_bytes, stats.output_bytes)
+
+        failed = PipelineStats()
+        with self.assertRaises(TranspilerError):
+            transpile('begin a := ; end.', stats=failed)
+        self.assertEqual(list(failed.seconds), ['lexer', 'syntax'])
+
+    def test_stats_accumulate(self):
+        code = "var a: integer := 1;\nbegin\nvar s: string := 'Ы';\nend."
+        once = PipelineStats()
+        transpile(code, stats=once)
+        # as if earlier transpilations spent a long time in every stage
+        stats = PipelineStats()
+        stats.seconds = dict.fromkeys(PipelineStats.STAGES, 100.0)
+        transpile(code, stats=stats)
+        transpile(code, stats=stats)
+        for stage in PipelineStats.STAGES:
+            self.assertGreater(stats.seconds[stage], 100.0)
+            self.assertLess(stats.seconds[stage], 101.0)
+        for field in ('tokens', 'nodes', 'variables', 'output_bytes'):
+            self.assertEqual(getattr(stats, field), 2 * getattr(once, field))
+
+
+class ExpressionEvaluatorTestCase(TestCase):
+    def evaluate(self, *operands):
+        return ExpressionEvaluator(list(operands)).evaluate()
+
+    def test_precedence(self):
+        self.assertIs(self.evaluate(
+            PascalInt(), '+', PascalInt(), '*', PascalInt(), '<', PascalInt()
+        ), True)
+        with self.assertRaises(TypeError):
+            self.evaluate(PascalInt(), '+', PascalInt(), '<', PascalString())
+        with self.assertRaises(TypeError):
+            self.evaluate('not', '(', PascalInt(), ')')
+
+    def test_short_circuit(self):
+        # right side is not evaluated, so type error in it is not raised
+        self.assertIs(self.evaluate(
+            True, 'or', PascalInt(), '+', PascalString()
+        ), True)
+        self.assertIs(self.evaluate(
+            'not', '(', True, ')', 'and', PascalInt(), '+', PascalString()
+        ), False)
+        with self.assertRaises(TypeError):
+            self.evaluate(True, 'and', PascalInt(), '+', PascalString())
+
+    def test_call(self):
+        result = self.evaluate(
+            PascalAnyComparable, '(', PascalInt(), ',', PascalString(), ')'
+        )
+        self.assertIsInstance(result, PascalAnyComparable)
+        with self.assertRaises(TypeError):
+            self.evaluate(
+                PascalAnyComparable, '(', PascalInt(), '+', True, ')'
+            )
+
+    def test_malformed(self):
+        with self.assertRaises(TypeError):
+            self.evaluate(True, 'and')
+        with self.assertRaises(TypeError):
+            self.evaluate('(', True)
+        with self.assertRaises(TypeError):
+            self.evaluate(True, ')')
+
+
+class SymbolTableTestCase(TestCase):
+    def test_scopes(self):
+        table = SymbolTable()
+        table.declare('a', 'integer', [])
+        self.assertEqual(table.depth, 0)
+
+        table.push_scope()
+        table.declare('b', 'char', [])
+        table.push_scope()
+        table.declare('c', 'real', [])
+        self.assertEqual(table.depth, 2)
+        self.assertEqual(table.get_type('a'), 'integer')
+        self.assertEqual(table.get_type('b'), 'char')
+        self.assertEqual(table.resolve('c'), {'type': 'real', 'expr': []})
+
+        table.pop_scope()
+        self.assertNotIn('c', table)
+        self.assertIsNone(table.resolve('c'))
+        with self.assertRaises(ValueError):
+            table.get_type('c')
+
+        table.pop_scope()
+        self.assertEqual(table.depth, 0)
+        self.assertIn('a', table)
+        self.assertNotIn('b', table)
+
+    def test_shadowing(self):
+        table = SymbolTable()
+        table.declare('a', 'integer', [])
+        table.push_scope()
+        table.declare('a', 'string', [])
+        self.assertEqual(table.get_type('a'), 'string')
+        table.pop_scope()
+        self.assertEqual(table.get_type('a'), 'integer')
+
+
+class CliTestCase(TestCase):
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.src = self.dir / 'src'
+        (self.src / 'sub').mkdir(parents=True)
+        (self.src / 'a.pas').write_text('begin writeln(1); end.')
+        (self.src / 'sub' / 'b.pas').write_text('begin writeln(2); end.')
+
+    def run_cli(self, *args: str) -> tuple[int, str]:
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            code = cli.main([
+                *args,
+                '-o', str(self.dir / 'out'),
+                '--cache-dir', str(self.dir / 'cache'),
+            ])
+        return code, stdout.getvalue()
+
+    def test_directory(self):
+        for jobs in ['1', '2']:
+            code, stdout = self.run_cli(str(self.src), '-j', jobs)
+            self.assertEqual(code, 0)
+            self.assertIn('2 transpiled', stdout)
+            self.assertEqual(
+                (self.dir / 'out' / 'sub' / 'b.pas.cs').read_text(),
+                transpile('begin writeln(2); end.'),
+            )
+
+    def test_cache(self):
+        code, stdout = self.run_cli(str(self.src))
+        self.assertTrue(stdout.endswith(
+            '2 transpiled (0 from cache), 0 failed\n'
+        ))
+        (self.src / 'a.pas').write_text('begin writeln(3); end.')
+        (self.dir / 'out' / 'sub' / 'b.pas.cs').unlink()
+        code, stdout = self.run_cli(str(self.src))
+        self.assertTrue(stdout.endswith(
+            '2 transpiled (1 from cache), 0 failed\n'
+        ))
+        self.assertEqual(
+            (self.dir / 'out' / 'sub' / 'b.pas.cs').read_text(),
+            transpile('begin writeln(2); end.'),
+        )
+
+        code, stdout = self.run_cli(str(self.src), '--no-cache')
+        self.assertTrue(stdout.endswith('2 transpiled, 0 failed\n'))
+
+    def test_unexpected_error(self):
+        (self.src / 'deep.pas').write_text('begin deep(); end.')
+
+        def crash(code: str, *args, **kwargs):
+            if 'deep' in code:
+                raise RecursionError('maximum recursion depth exceeded')
+            return transpile(code, *args, **kwargs)
+
+        for jobs in ['1', '2']:
+            with mock.patch('transpiler.cli.transpile', crash):
+                code, stdout = self.run_cli(str(self.src), '-j', jobs)
+            self.assertEqual(code, 1)
+            self.assertIn(
+                'deep.pas: RecursionError: maximum recursion depth exceeded',
+                stdout,
+            )
+            self.assertIn('2 transpiled', stdout)
+            self.assertTrue(stdout.endswith('1 failed\n'))
+            self.assertFalse((self.dir / 'out' / 'deep.pas.cs').exists())
+
+    def test_cache_errors(self):
+        not_a_dir = self.dir / 'cache'
+        not_a_dir.write_text('')
+        with self.assertLogs('transpiler.build_cache', 'WARNING') as logs:
+            code, stdout = self.run_cli(str(self.src), '-j', '2')
+        self.assertEqual(code, 0)
+        self.assertTrue(stdout.endswith('2 transpiled, 0 failed\n'))
+        self.assertEqual(len(logs.output), 1)
+
+        # errors when the cache is already in use
+        cache = BuildCache(not_a_dir, 'fingerprint')
+        out = self.dir / 'out2'
+        with self.assertLogs('transpiler.build_cache', 'WARNING') as logs:
+            results = [
+                cli.transpile_file(source, out / f'{source.name}.cs', cache)
+                for source in [self.src / 'a.pas', self.src / 'sub' / 'b.pas']
+            ]
+        self.assertEqual(results, [(None, False), (None, False)])
+        self.assertEqual(len(logs.output), 1)
+        self.assertEqual((out / 'b.pas.cs').read_text(),
+                         transpile('begin writeln(2); end.'))
+
+    def test_cache_streams_result(self):
+        (self.src / 'bad.pas').write_text('begin b := 1; end.')
+        with mock.patch('transpiler.cli.transpile', wraps=transpile) as call:
+            self.run_cli(str(self.src))
+        # results are written to output files, never built as strings
+        self.assertEqual(call.call_count, 3)
+        for args in call.call_args_list:
+            self.assertIsNotNone(args.kwargs['output'])
+        # entries are copies of output files, nothing of the failed one
+        entries = sorted(
+            path.read_text() for path in (self.dir / 'cache').rglob('*.cs')
+        )
+        self.assertEqual(entries, sorted(
+            path.read_text() for path in (self.dir / 'out').rglob('*.cs')
+        ))
+        self.assertEqual(len(entries), 2)
+
+    def test_watch(self):
+        out = self.dir / 'out'
+        a, c = self.src / 'a.pas', self.src / 'c.pas'
+        a.write_text('begin writeln(3); end.')
+        c.write_text('begin writeln(4); end.')
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            cli.watch([str(self.src)], out, None, [
+                {a.resolve(), (out / 'a.pas.cs').resolve()},
+                {c.resolve()},
+            ])
+        self.assertEqual(stdout.getvalue().count('1 transpiled'), 2)
+        self.assertEqual((out / 'c.pas.cs').read_text(),
+                         transpile('begin writeln(4); end.'))
+        self.assertFalse((out / 'sub').exists())
+
+    def test_watch_sources_in_output_dir(self):
+        b = self.src / 'b.pas'
+        stdout = io.StringIO()
+
+        def changes():
+            # sources and results share a directory, as in examples
+            (self.src / 'a.pas.cs').write_text('')
+            yield {(self.src / 'a.pas.cs').resolve()}
+            b.write_text('begin writeln(5); end.')
+            yield {b.resolve()}
+
+        with contextlib.redirect_stdout(stdout):
+            cli.watch([str(self.src / '*.pas')], self.src, None, changes())
+        self.assertEqual(stdout.getvalue().count('1 transpiled'), 1)
+        self.assertEqual((self.src / 'b.pas.cs').read_text(),
+                         transpile('begin writeln(5); end.'))
+
+    def test_changes_before_iteration(self):
+        a = self.src / 'a.pas'
+
+        def list_sources() -> list[Path]:
+            return list(cli.collect_sources([str(self.src)], self.dir))
+
+        backends = [True] if watch.watchfiles is None else [True, False]
+        for force_polling in backends:
+            changes = watch.watch_changes([str(self.src)], list_sources,
+                                          force_polling=force_polling)
+            # saved while the first build runs
+            a.write_text(f'begin writeln({10 + force_polling}); end.')
+            new = self.src / f'new{force_polling}.pas'
+            new.write_text('begin end.')
+            self.assertEqual(next(changes), {a.resolve(), new.resolve()})
+            changes.close()
+
+    def test_failure(self):
+        (self.src / 'bad.pas').write_text('begin b := 1; end.')
+        code, stdout = self.run_cli(str(self.src / '*.pas'))
+        self.assertEqual(code, 1)
+        self.assertIn('bad.pas: SemanticError: b at line 1', stdout)
+        self.assertIn('1 transpiled', stdout)
+        self.assertTrue(stdout.endswith('1 failed\n'))
+        self.assertTrue((self.dir / 'out' / 'a.pas.cs').exists())
+        self.assertFalse((self.dir / 'out' / 'bad.pas.cs').exists())
+
+
+@skipUnless(WEB_INSTALLED, 'web dependencies are not installed')
+class ResultCacheTestCase(TestCase):
+    @staticmethod
+    def result(text: str):
+        return TranspileResult(success=True, result=text)
+
+    def test_source_key(self):
+        self.assertEqual(source_key('begin end.'), source_key('begin end.'))
+        self.assertNotEqual(source_key('begin end.'), source_key('begin'))
+        self.assertEqual(len(source_key('begin end.')), 16)
+
+    def test_get(self):
+        cache = ResultCache(4, 1024)
+        cache.put(b'a', self.result('A'))
+        self.assertEqual(cache.get(b'a'), self.result('A'))
+        self.assertIsNone(cache.get(b'b'))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_evict_least_recently_used(self):
+        cache = ResultCache(2, 1024)
+        cache.put(b'a', self.result('A'))
+        cache.put(b'b', self.result('B'))
+        # a is used after b, so b is evicted
+        cache.get(b'a')
+        cache.put(b'c', self.result('C'))
+        self.assertIsNone(cache.get(b'b'))
+        self.assertEqual(cache.get(b'a'), self.result('A'))
+        self.assertEqual(cache.get(b'c'), self.result('C'))
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual(cache.stats().entries, 2)
+
+    def test_evict_by_bytes(self):
+        # every entry is 1 byte of key and 9 bytes of result
+        cache = ResultCache(10, 25)
+        for key in [b'a', b'b', b'c']:
+            cache.put(key, self.result('x' * 9))
+        self.assertEqual(cache.bytes, 20)
+        self.assertEqual(cache.evictions, 1)
+        self.assertIsNone(cache.get(b'a'))
+        self.assertIsNotNone(cache.get(b'b'))
+
+    def test_replace(self):
+        cache = ResultCache(10, 1024)
+        cache.put(b'a', self.result('x' * 9))
+        cache.put(b'a', self.result('y'))
+        self.assertEqual(cache.bytes, 2)
+        self.assertEqual(cache.get(b'a'), self.result('y'))
+        self.assertEqual(cache.evictions, 0)
+
+    def test_skip_oversize(self):
+        cache = ResultCache(10, 10)
+        cache.put(b'a', self.result('x' * 9))
+        cache.put(b'b', self.result('x' * 10))
+        self.assertIsNone(cache.get(b'b'))
+        # nothing is evicted for an entry which would not fit anyway
+        self.assertIsNotNone(cache.get(b'a'))
+        self.assertEqual(cache.evictions, 0)
+
+    def test_stats(self):
+        cache = ResultCache(1, 1024)
+        cache.put(b'a', self.result('A'))
+        cache.put(b'b', self.result('B'))
+        cache.get(b'a')
+        cache.get(b'b')
+        stats = cache.stats()
+        self.assertEqual(
+            (stats.entries, stats.bytes, stats.max_entries, stats.max_bytes),
+            (1, 2, 1, 1024),
+        )
+        self.assertEqual(
+            (stats.hits, stats.misses, stats.evictions), (1, 1, 1)
+        )
+
+
+def exit_worker(*args):
+    """
+    Job which kills its worker process, as if it was killed by a signal.
+    """
+    os._exit(1)
+
+
+@skipUnless(WEB_INSTALLED, 'web dependencies are not installed')
+class PoolTestCase(TestCase):
+    @staticmethod
+    def thread_pool(workers: int, queue_size: int, small_workers: int = 0,
+                    small_size: int = 0):
+        """
+        Pool running jobs in threads of this process, so it needs no
+        start() and submitted jobs may be mocked.
+        """
+        pool = TranspilePool(workers, queue_size, small_workers, small_size)
+        pool.executor = ThreadPoolExecutor(workers)
+        if small_workers:
+            pool.small_executor = ThreadPoolExecutor(small_workers)
+        return pool
+
+    def test_transpile_many(self):
+        codes = [f'begin writeln({i}); end.' for i in range(8)]
+        pool = self.thread_pool(3, 0)
+        with mock.patch.object(pool.executor, 'submit',
+                               wraps=pool.executor.submit) as submit:
+            results = asyncio.run(pool.transpile_many(codes))
+        self.assertEqual(
+            [result.result for result in results],
+            [transpile(code) for code in codes],
+        )
+        # one job per worker, with codes 0, 3, 6 in the first one
+        self.assertEqual(submit.call_count, 3)
+        self.assertEqual(submit.call_args_list[0].args[1], codes[0::3])
+        self.assertEqual(pool.pending, 0)
+
+    def test_transpile_many_fewer_codes_than_workers(self):
+        pool = self.thread_pool(4, 0)
+        results = asyncio.run(pool.transpile_many(['begin end.']))
+        self.assertEqual([result.success for result in results], [True])
+        self.assertEqual(asyncio.run(pool.transpile_many([])), [])
+
+    def test_saturated(self):
+        pool = self.thread_pool(2, 1)
+        pool.pending = 2
+        pool.reserve(1)
+        with self.assertRaises(PoolSaturatedError):
+            pool.reserve(2)
+        # a batch needs a job for every chunk
+        with self.assertRaises(PoolSaturatedError):
+            asyncio.run(pool.transpile_many(['begin end.'] * 4))
+        self.assertEqual(pool.pending, 2)
+
+    def test_small_lane(self):
+        pool = self.thread_pool(1, 0, small_workers=1, small_size=100)
+        release = threading.Event()
+
+        async def submit() -> list[bool]:
+            large = pool.submit(release.wait, size=1000)
+            # the general worker is busy, small job takes the other lane
+            self.assertTrue(pool.is_small(10))
+            self.assertFalse(pool.is_small(1000))
+            small = pool.submit(int, size=10)
+            self.assertEqual(await small, 0)
+            self.assertFalse(large.done())
+            release.set()
+            await large
+            # let done callbacks of both jobs run
+            await asyncio.sleep(0.01)
+            return pool.is_small(10)
+
+        self.assertFalse(asyncio.run(submit()))
+        self.assertEqual((pool.pending, pool.general_pending), (0, 0))
+
+    def test_worker_lost(self):
+        code = 'begin writeln(7); end.'
+
+        async def run() -> list:
+            pool = TranspilePool(1, 4)
+            await pool.start()
+            broken = pool.executor
+            try:
+                with mock.patch('web.pool.run_transpile', exit_worker), \
+                        mock.patch('web.app.pool', pool):
+                    lost = await get_transpiled(Code(code=code))
+                # the next job runs in a new executor
+                result = await pool.transpile(code)
+                with mock.patch('web.pool.run_transpile_many', exit_worker):
+                    batch = await pool.transpile_many([code, code])
+                batch_after = await pool.transpile_many([code])
+                return [lost, broken, pool, result, batch, batch_after]
+            finally:
+                pool.shutdown()
+
+        with contextlib.redirect_stderr(io.StringIO()):
+            lost, broken, pool, result, batch, batch_after = \
+                asyncio.run(run())
+        self.assertIsInstance(lost, WorkerLostResult)
+        self.assertFalse(lost.success)
+        self.assertTrue(lost.result.startswith('BrokenProcessPool'))
+        # it fails the job, not the source, so it is not cached
+        self.assertIsNone(app_cache.get(source_key(code)))
+        self.assertIsNot(broken, pool.executor)
+        self.assertEqual(result.result, transpile(code))
+        self.assertEqual([type(item) for item in batch], [WorkerLostResult] * 2)
+        self.assertTrue(batch_after[0].success)
+        self.assertEqual(pool.pending, 0)
+
+    def test_batch_limits(self):
+        def batch(size: int) -> Batch:
+            return Batch(sources=[
+                {'name': f'{i}.pas', 'code': f'begin writeln({i}); end.'}
+                for i in range(size)
+            ])
+
+        with mock.patch('web.app.BATCH_MAX_SIZE', 2), \
+                self.assertRaises(HTTPException) as raised:
+            asyncio.run(get_transpiled_batch(batch(3)))
+        self.assertEqual(raised.exception.status_code, 413)
+
+        pool = self.thread_pool(2, 0)
+        pool.pending = 1
+        with mock.patch('web.app.pool', pool), \
+                self.assertRaises(HTTPException) as raised:
+            asyncio.run(get_transpiled_batch(batch(2)))
+        self.assertEqual(raised.exception.status_code, 503)
+        self.assertEqual(raised.exception.headers, {'Retry-After': '1'})
+
+    def test_unexpected_error(self):
+        def crash(code: str, **kwargs) -> str:
+            if code == 'crash':
+                raise IndexError('string index out of range')
+            return transpile(code, **kwargs)
+
+        with mock.patch('web.pool.transpile', crash), \
+                contextlib.redirect_stderr(io.StringIO()):
+            results = run_transpile_many(
+                ['begin end.', 'crash', 'begin b := 1; end.']
+            )
+        results = [result for result, _ in results]
+        self.assertEqual(
+            [result.success for result in results], [True, False, False]
+        )
+        self.assertEqual(results[0].result, transpile('begin end.'))
+        self.assertEqual(results[1].result,
+                         'IndexError: string index out of range')
+        self.assertTrue(results[2].result.startswith('SemanticError'))
+
+
+class FakeWebSocket:
+    """
+    Client side of a WebSocket: messages put in incoming are received by
+    server, None disconnects.
+    """
+
+    def __init__(self):
+        self.incoming = asyncio.Queue()
+        self.outgoing = asyncio.Queue()
+        self.closed_with = None
+
+    async def accept(self):
+        pass
+
+    async def receive_json(self):
+        message = await self.incoming.get()
+        if message is None:
+            raise WebSocketDisconnect()
+        return message
+
+    async def send_json(self, message):
+        await self.outgoing.put(message)
+
+    async def close(self, code: int):
+        self.closed_with = code
+
+
+@skipUnless(WEB_INSTALLED, 'web dependencies are not installed')
+class LiveSessionTestCase(TestCase):
+    def setUp(self):
+        self.pool = PoolTestCase.thread_pool(1, 4)
+        self.cache = ResultCache(16, 1024 * 1024)
+
+    def talk(self, websocket: FakeWebSocket, messages: list) -> list:
+        """
+        Send every message after reply to the previous one, return
+        replies.
+        """
+        async def talk() -> list:
+            session = asyncio.create_task(
+                LiveSession(websocket, self.pool, self.cache).run()
+            )
+            replies = []
+            for message in messages:
+                await websocket.incoming.put(message)
+                if message is not None:
+                    replies.append(await asyncio.wait_for(
+                        websocket.outgoing.get(), timeout=5
+                    ))
+            await asyncio.wait_for(session, timeout=5)
+            return replies
+
+        with contextlib.redirect_stderr(io.StringIO()):
+            return asyncio.run(talk())
+
+    def test_failed_job(self):
+        def crash(code: str):
+            if code == 'crash':
+                raise RuntimeError('worker died')
+            return run_transpile_many([code])[0]
+
+        websocket = FakeWebSocket()
+        with mock.patch('web.live.run_transpile', crash):
+            replies = self.talk(websocket, [
+                {'version': 1, 'code': 'crash'},
+                {'version': 2, 'code': 'begin end.'},
+                None,
+            ])
+        self.assertEqual(replies, [
+            {'version': 1, 'success': False,
+             'result': 'RuntimeError: worker died'},
+            {'version': 2, 'success': True, 'result': transpile('begin end.')},
+        ])
+        self.assertIsNone(websocket.closed_with)
+        # failure of the pool is not cached
+        self.assertIsNone(self.cache.get(source_key('crash')))
+
+    def test_invalid_message(self):
+        websocket = FakeWebSocket()
+
+        async def talk():
+            session = LiveSession(websocket, self.pool, self.cache)
+            await websocket.incoming.put({'code': 'begin end.'})
+            await asyncio.wait_for(session.run(), timeout=5)
+
+        asyncio.run(talk())
+        self.assertEqual(websocket.closed_with,
+                         status.WS_1003_UNSUPPORTED_DATA)
+
+    def test_transpiling_failed(self):
+        websocket = FakeWebSocket()
+        websocket.send_json = mock.AsyncMock(side_effect=RuntimeError)
+
+        async def talk():
+            session = LiveSession(websocket, self.pool, self.cache)
+            await websocket.incoming.put({'version': 1, 'code': 'begin end.'})
+            # ends although client neither sends nor disconnects
+            await asyncio.wait_for(session.run(), timeout=5)
+
+        with contextlib.redirect_stderr(io.StringIO()):
+            asyncio.run(talk())
+        self.assertEqual(websocket.closed_with, status.WS_1011_INTERNAL_ERROR)
+
+
+@skipUnless(WEB_INSTALLED, 'web dependencies are not installed')
+class StaticAssetsTestCase(TestCase):
+    INDEX = (
+        '<link href="static/style.css">'
+        "<script src='static/main.js'></script>"
+        '<script src="static/missing.js"></script>'
+        '<a href="https://example.com/static/main.js">'
+    )
+
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.dir)
+        (self.dir / 'index.html').write_text(self.INDEX)
+        (self.dir / 'style.css').write_text('body {}')
+        (self.dir / 'main.js').write_text('console.log(1);\n' * 100)
+        self.assets = StaticAssets(self.dir, 'index.html', 'static/', 64)
+
+    @staticmethod
+    def request(query: str = '', **headers: str):
+        return Request({
+            'type': 'http',
+            'method': 'GET',
+            'path': '/',
+            'query_string': query.encode(),
+            'headers': [
+                (name.replace('_', '-').lower().encode(), value.encode())
+                for name, value in headers.items()
+            ],
+        })
+
+    def test_index_versions(self):
+        script = self.assets.get('main.js')
+        style = self.assets.get('style.css')
+        self.assertEqual(len(script.version), 12)
+        self.assertNotEqual(script.version, style.version)
+        self.assertEqual(self.assets.index.content.decode(), (
+            f'<link href="static/style.css?v={style.version}">'
+            f"<script src='static/main.js?v={script.version}'></script>"
+            '<script src="static/missing.js"></script>'
+            '<a href="https://example.com/static/main.js">'
+        ))
+        self.assertEqual(self.assets.index.media_type, 'text/html')
+
+    def test_version_changes_with_content(self):
+        (self.dir / 'main.js').write_text('console.log(2);\n' * 100)
+        assets = StaticAssets(self.dir, 'index.html', 'static/', 64)
+        self.assertNotEqual(assets.get('main.js').version,
+                            self.assets.get('main.js').version)
+        self.assertNotEqual(assets.index.etag, self.assets.index.etag)
+
+    def test_gzip(self):
+        script = self.assets.get('main.js')
+        identity = script.response(self.request(), REVALIDATE)
+        gzipped = script.response(
+            self.request(accept_encoding='gzip, deflate'), REVALIDATE
+        )
+        self.assertEqual(identity.body, script.content)
+        self.assertNotIn('Content-Encoding', identity.headers)
+        self.assertEqual(gzipped.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(gzipped.body), script.content)
+        self.assertNotEqual(identity.headers['ETag'], gzipped.headers['ETag'])
+        for response in (identity, gzipped):
+            self.assertEqual(response.headers['Vary'], 'Accept-Encoding')
+            self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+            self.assertTrue(
+                response.headers['Content-Type'].startswith('text/javascript')
+            )
+
+    def test_small_file_not_gzipped(self):
+        style = self.assets.get('style.css')
+        response = style.response(self.request(accept_encoding='gzip'),
+                                  IMMUTABLE)
+        self.assertIsNone(style.gzipped)
+        self.assertEqual(response.body, b'body {}')
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertNotIn('Vary', response.headers)
+        self.assertEqual(response.headers['Cache-Control'], IMMUTABLE)
+
+    def test_not_modified(self):
+        script = self.assets.get('main.js')
+        etag = script.response(self.request(), REVALIDATE).headers['ETag']
+        response = script.response(
+            self.request(if_none_match=f'"other", {etag}'), REVALIDATE
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.body, b'')
+        self.assertEqual(response.headers['ETag'], etag)
+        self.assertEqual(response.headers['Cache-Control'], REVALIDATE)
+        # tag of identity body does not match gzipped one
+        response = script.response(
+            self.request(if_none_match=etag, accept_encoding='gzip'),
+            REVALIDATE,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+
+    def test_route_cache_control(self):
+        version = assets.get('main.js').version
+
+        def cache_control(query: str) -> str:
+            response = asyncio.run(
+                get_static('main.js', self.request(query))
+            )
+            return response.headers['Cache-Control']
+
+        self.assertEqual(cache_control(f'v={version}'), IMMUTABLE)
+        self.assertEqual(cache_control('v=outdated'), REVALIDATE)
+        self.assertEqual(cache_control(''), REVALIDATE)
+        with self.assertRaises(HTTPException) as raised:
+            asyncio.run(get_static('missing.js', self.request()))
+        self.assertEqual(raised.exception.status_code, 404)
+
+
+@skipUnless(WEB_INSTALLED, 'web dependencies are not installed')
+class MetricsTestCase(TestCase):
+    def test_histogram(self):
+        histogram = metrics.Histogram('h', 'Help.', [5, 1], ('stage',))
+        for value in [0.5, 1, 3, 10]:
+            histogram.observe(value, 'a')
+        histogram.observe(2, 'b')
+        self.assertEqual(histogram.render(), [
+            '# HELP h Help.',
+            '# TYPE h histogram',
+            'h_bucket{stage="a",le="1"} 2',
+            'h_bucket{stage="a",le="5"} 3',
+            'h_bucket{stage="a",le="+Inf"} 4',
+            'h_sum{stage="a"} 14.5',
+            'h_count{stage="a"} 4',
+            'h_bucket{stage="b",le="1"} 0',
+            'h_bucket{stage="b",le="5"} 1',
+            'h_bucket{stage="b",le="+Inf"} 1',
+            'h_sum{stage="b"} 2.0',
+            'h_count{stage="b"} 1',
+        ])
+
+    def test_record(self):
+        stats = PipelineStats()
+        transpile('begin writeln(1); end.', stats=stats)
+        failed = PipelineStats()
+        with self.assertRaises(TranspilerError):
+            transpile('begin a := ; end.', stats=failed)
+
+        sizes = {
+            field: metrics.Histogram(field, field, [16, 1024])
+            for field in metrics.sizes
+        }
+        with mock.patch.object(metrics, 'transpilations', metrics.Counter(
+                'transpilations', 'Help.', ('success',))), \
+                mock.patch.object(metrics, 'stage_seconds', metrics.Histogram(
+                    'seconds', 'Help.', [1], ('stage',))), \
+                mock.patch.dict(metrics.sizes, sizes):
+            metrics.record(stats.as_dict(), True)
+            metrics.record(failed.as_dict(), False)
+            lines = metrics.render(
+                metrics.sample('pending', 'Pending jobs.', 'gauge', 3)
+            ).splitlines()
+
+        self.assertIn('transpilations{success="true"} 1', lines)
+        self.assertIn('transpilations{success="false"} 1', lines)
+        # failed transpilation stopped after syntax analysis
+        self.assertIn('seconds_count{stage="lexer"} 2', lines)
+        self.assertIn('seconds_count{stage="syntax"} 2', lines)
+        self.assertIn('seconds_count{stage="codegen"} 1', lines)
+        # sizes of the successful one only
+        self.assertIn('tokens_count 1', lines)
+        self.assertIn(f'tokens_sum {float(stats.tokens)}', lines)
+        self.assertIn(
+            f'output_bytes_sum {float(stats.output_bytes)}', lines
+        )
+        self.assertEqual(lines[-3:], [
+            '# HELP pending Pending jobs.',
+            '# TYPE pending gauge',
+            'pending 3',
+        ])
+
+
 class ExamplesTestCase(TestCase):
     def test_supported_syntax(self):
         pascal_code = (
@@ -1,15 +1,106 @@
+import copy
+import time
+from pathlib import Path
+from typing import TextIO
+from transpiler.base import (
+    Terminal,
+    LexerRule,
+    GrammarRule,
+    TranspilerError,
+)
 from transpiler.lexer import Lexer
 from transpiler.syntax_analyzer import SyntaxAnalyzer
 from transpiler.semantic_analyzer import SemanticAnalyzer
-from transpiler.settings import Tag, LEXER_RULES, GRAMMAR_RULES
+from transpiler.trace import Tracer
+from transpiler.stats import PipelineStats, timed_tokens
+from transpiler.settings import (
+    Tag,
+    LEXER_RULES,
+    GRAMMAR_RULES,
+    GRAMMAR_CACHE_PATH,
+    TRACE_BUFFER_SIZE,
+)
 
 
-def transpile(code: str) -> str:
-    lexer = Lexer(Tag, LEXER_RULES)
-    lexer.buffer = code
+class Transpiler:
+    """
+    Pascal to C# pipeline with lexer regex and predict table built once.
 
-    syntax_analyzer = SyntaxAnalyzer(GRAMMAR_RULES)
-    tree = syntax_analyzer.parse(lexer.tokens)
+    Instances are reusable and transpile() is re-entrant: every call works
+    on its own copies of the lexer and the syntax analyzer and on a fresh
+    semantic analyzer with its own symbol table and type checkers, while
+    lexer regex and parse table are only read. So one instance, as well as
+    module level transpile(), may be used from several threads at once.
 
-    semantic_analyzer = SemanticAnalyzer(tree, code)
-    return semantic_analyzer.parse()
+    With trace_size > 0 latest lexer and parser events of every call are
+    kept in a ring buffer and attached to the raised error as its trace.
+    """
+
+    def __init__(
+        self,
+        terminal_cls: type[Terminal] = Tag,
+        lexer_rules: list[LexerRule] = LEXER_RULES,
+        grammar_rules: list[GrammarRule] = GRAMMAR_RULES,
+        grammar_cache_path: Path | None = None,
+        trace_size: int = 0,
+    ):
+        self.trace_size = trace_size
+        self.lexer = Lexer(terminal_cls, lexer_rules)
+        self.syntax_analyzer = SyntaxAnalyzer(
+            grammar_rules,
+            cache_path=grammar_cache_path,
+        )
+
+    def transpile(self, code: str, filepath: str | None = None,
+                  output: TextIO | None = None,
+                  stats: PipelineStats | None = None) -> str | None:
+        """
+        Return C# code, or stream it to output text stream and return None.
+
+        If stats is given, it is filled with durations of pipeline stages
+        and sizes of their results, also when transpilation fails.
+        """
+        tracer = Tracer(self.trace_size) if self.trace_size else None
+
+        lexer = copy.copy(self.lexer)
+        lexer.filepath = filepath
+        lexer.tracer = tracer
+        lexer.buffer = code
+        tokens = lexer.tokens
+        if stats is not None:
+            # stats may already hold earlier transpilations
+            lexer_before = stats.seconds.get('lexer', 0.0)
+            tokens = timed_tokens(tokens, stats)
+            start = time.perf_counter()
+
+        syntax_analyzer = copy.copy(self.syntax_analyzer)
+        syntax_analyzer.filepath = filepath
+        syntax_analyzer.tracer = tracer
+        try:
+            tree = syntax_analyzer.parse(tokens)
+        except TranspilerError as error:
+            if tracer is not None:
+                error.trace = tracer.dump()
+            raise
+        finally:
+            if stats is not None:
+                tokens.close()
+                lexer_seconds = stats.seconds['lexer'] - lexer_before
+                stats.add_time(
+                    'syntax', time.perf_counter() - start - lexer_seconds
+                )
+
+        semantic_analyzer = SemanticAnalyzer(tree, code, filepath, stats)
+        return semantic_analyzer.parse(output)
+
+
+default_transpiler = Transpiler(
+    grammar_cache_path=GRAMMAR_CACHE_PATH,
+    trace_size=TRACE_BUFFER_SIZE,
+)
+
+
+def transpile(code: str, filepath: str | None = None,
+              output: TextIO | None = None,
+              stats: PipelineStats | None = None) -> str | None:
+    return default_transpiler.transpile(code, filepath, output, stats)
@@ -1,13 +1,5 @@
 import sys
-from pathlib import Path
-from transpiler.settings import EXAMPLES_DIR
-from transpiler import transpile
+from transpiler.cli import main
 
 
-filepath = sys.argv[1]
-
-code = Path(filepath).read_text()
-sharp_code = transpile(code)
-
-new_filename = f'{filepath.rsplit("/", maxsplit=1)[-1]}.cs'
-(EXAMPLES_DIR / new_filename).write_text(sharp_code, encoding='utf-8')
+sys.exit(main())
@@ -1,12 +1,9 @@
-import re
 from enum import Enum
 
 
-WHITESPACE = re.compile('\S')
-
-
 class TranspilerError(Exception):
-    pass
+    # dump of latest lexer and parser events, set when tracing is enabled
+    trace: str | None = None
 
 
 class TranspilerEnum(Enum):
@@ -58,17 +55,21 @@ class Token:
     Minimal sensible unit of code sequence.
     """
 
+    __slots__ = ('tag', 'value', 'pos', 'line', 'column')
+
     def __init__(
         self,
         tag: Symbol,
         value: str,
         pos: int | None = None,
         line: int | None = None,
+        column: int | None = None,
     ):
         self.tag = tag
         self.value = value
         self.pos = pos
         self.line = line
+        self.column = column
 
     def __str__(self):
         return str(self.value)
@@ -0,0 +1,113 @@
+"""
+On-disk cache of transpiled files, addressed by hash of source code and
+of the transpiler itself.
+"""
+import contextlib
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+
+logger = logging.getLogger(__name__)
+
+TRANSPILER_DIR = Path(__file__).parent
+
+
+def transpiler_fingerprint() -> str:
+    """
+    Hash of transpiler modules. Grammar, lexer rules and code generation
+    are all defined by them, so results of another version never match.
+    """
+    digest = hashlib.sha256()
+    for path in sorted(TRANSPILER_DIR.glob('*.py')):
+        digest.update(path.name.encode())
+        digest.update(b'\0')
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+class BuildCache:
+    """
+    Results of successful transpilations, one file per result. Entries
+    are never changed once written, so they are not locked, and several
+    processes may share a cache.
+
+    Errors of cache I/O never fail a transpilation: an entry which cannot
+    be read is a miss, one which cannot be written is skipped, and only
+    the first error is reported.
+    """
+
+    def __init__(self, directory: Path, fingerprint: str):
+        self.directory = Path(directory)
+        self.fingerprint = fingerprint
+        self.warned = False
+
+    def warn(self, error: OSError):
+        if not self.warned:
+            self.warned = True
+            logger.warning(f'cannot use build cache {self.directory}: {error}')
+
+    def usable(self) -> bool:
+        """
+        Create cache directory, return whether entries can be written to
+        it, reporting why if they cannot.
+        """
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        except OSError as error:
+            self.warn(error)
+            return False
+        if not os.access(self.directory, os.W_OK):
+            self.warn(PermissionError('directory is not writable'))
+            return False
+        return True
+
+    def key(self, code: str) -> str:
+        digest = hashlib.sha256(self.fingerprint.encode())
+        digest.update(b'\0')
+        digest.update(code.encode())
+        return digest.hexdigest()
+
+    def path(self, key: str) -> Path:
+        return self.directory / key[:2] / f'{key[2:]}.cs'
+
+    def get(self, key: str, target: Path) -> bool:
+        """
+        Copy cached result to target, return whether there was one.
+        """
+        path = self.path(key)
+        try:
+            if not path.is_file():
+                return False
+            shutil.copyfile(path, target)
+        except OSError as error:
+            self.warn(error)
+            return False
+        return True
+
+    def put(self, key: str, result: Path):
+        """
+        Store a copy of result file, so large results are never read in
+        memory.
+        """
+        path = self.path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name)
+        except OSError as error:
+            self.warn(error)
+            return
+        os.close(fd)
+        try:
+            shutil.copyfile(result, tmp_path)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException as error:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_path)
+            if not isinstance(error, OSError):
+                raise
+            self.warn(error)
@@ -0,0 +1,12 @@
+from transpiler.settings import GRAMMAR_RULES, GRAMMAR_CACHE_PATH
+from transpiler.syntax_analyzer import SyntaxAnalyzer
+
+
+def main():
+    analyzer = SyntaxAnalyzer(GRAMMAR_RULES)
+    analyzer.dump(GRAMMAR_CACHE_PATH)
+    print(f'grammar cache written to {GRAMMAR_CACHE_PATH}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+"""
+Command line interface: transpile files, directories and globs of Pascal
+sources into an output directory.
+"""
+import glob
+import os
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable
+from transpiler import transpile
+from transpiler.build_cache import BuildCache, transpiler_fingerprint
+from transpiler.settings import EXAMPLES_DIR, BUILD_CACHE_DIR
+from transpiler.watch import watch_changes
+
+
+SOURCE_PATTERN = '*.pas'
+
+
+def get_parser() -> ArgumentParser:
+    parser = ArgumentParser('python -m transpiler')
+    parser.add_argument(
+        'sources', nargs='+',
+        help=f'files, directories (searched for {SOURCE_PATTERN} '
+             f'recursively) and glob patterns',
+    )
+    parser.add_argument(
+        '-o', '--output-dir', type=Path, default=EXAMPLES_DIR,
+        help='directory for <source name>.cs files, structure of source '
+             'directories is kept (default: %(default)s)',
+    )
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=1,
+        help='number of worker processes, 0 for number of CPUs '
+             '(default: %(default)s)',
+    )
+    parser.add_argument(
+        '--cache-dir', type=Path, default=BUILD_CACHE_DIR,
+        help='directory of cached results, which are reused for unchanged '
+             'sources (default: %(default)s)',
+    )
+    parser.add_argument(
+        '--no-cache', action='store_true',
+        help='neither use nor update cached results',
+    )
+    parser.add_argument(
+        '-w', '--watch', action='store_true',
+        help='keep running and transpile sources again when they change',
+    )
+    parser.add_argument(
+        '--poll', action='store_true',
+        help='in watch mode, check modification times of sources instead '
+             'of using file system events',
+    )
+    return parser
+
+
+def collect_sources(args: list[str],
+                    output_dir: Path) -> dict[Path, Path]:
+    """
+    Return source path -> output path. Files found in a directory keep
+    their path relative to it, other files are put in output_dir itself.
+    """
+    targets: dict[Path, Path] = {}
+
+    def add(source: Path, relative: Path):
+        targets.setdefault(
+            source, output_dir / relative.with_name(f'{relative.name}.cs')
+        )
+
+    for arg in args:
+        path = Path(arg)
+        if path.is_dir():
+            for source in sorted(path.rglob(SOURCE_PATTERN)):
+                if source.is_file():
+                    add(source, source.relative_to(path))
+        elif path.exists() or not glob.has_magic(arg):
+            add(path, Path(path.name))
+        else:
+            for match in sorted(glob.glob(arg, recursive=True)):
+                if Path(match).is_file():
+                    add(Path(match), Path(Path(match).name))
+    return targets
+
+
+def transpile_file(
+    source: Path,
+    target: Path,
+    cache: BuildCache | None = None,
+) -> tuple[str | None, bool]:
+    """
+    Write C# code of source to target. Return error message on any
+    failure, nothing is left in target then, and whether result was
+    cached.
+    """
+    hit = False
+    try:
+        code = source.read_text(encoding='utf-8')
+        target.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            if cache is not None:
+                key = cache.key(code)
+                hit = cache.get(key, target)
+            if not hit:
+                # streamed, so large results are never built as a string
+                with open(target, 'w', encoding='utf-8') as file:
+                    transpile(code, str(source), output=file)
+        except BaseException:
+            target.unlink(missing_ok=True)
+            raise
+        if cache is not None and not hit:
+            cache.put(key, target)
+    except Exception as error:
+        # e.g. a bug of transpiler hit by this source, other files go on
+        return f'{error.__class__.__name__}: {error}', False
+    return None, hit
+
+
+def run(targets: dict[Path, Path], jobs: int,
+        cache: BuildCache | None) -> list[tuple[str | None, bool]]:
+    sources, outputs = list(targets), list(targets.values())
+    caches = [cache] * len(sources)
+    if jobs == 1 or len(sources) <= 1:
+        return list(map(transpile_file, sources, outputs, caches))
+    with ProcessPoolExecutor(jobs) as executor:
+        # several files per task, so small files do not cost a round-trip
+        # to a worker each
+        chunksize = max(1, len(sources) // (jobs * 4))
+        return list(executor.map(
+            transpile_file, sources, outputs, caches, chunksize=chunksize
+        ))
+
+
+def report(targets: dict[Path, Path], results: list[tuple[str | None, bool]],
+           cache: BuildCache | None) -> int:
+    """
+    Print result of every file and summary, return number of failures.
+    """
+    failed = hits = 0
+    for (source, target), (error, hit) in zip(targets.items(), results):
+        if error is None:
+            hits += hit
+            status = 'cached' if hit else 'ok'
+            print(f'{status:<8}{source} -> {target}')
+        else:
+            failed += 1
+            print(f'FAILED  {source}: {error}')
+    summary = f'{len(targets) - failed} transpiled'
+    if cache is not None:
+        summary += f' ({hits} from cache)'
+    print(f'{summary}, {failed} failed', flush=True)
+    return failed
+
+
+def watch(sources: list[str], output_dir: Path, cache: BuildCache | None,
+          changes: Iterable[set[Path]]):
+    """
+    Transpile sources again whenever they are reported in changes, in
+    this process, which already has the grammar loaded.
+
+    Sources are listed again only when a file changes which is neither a
+    known source, nor its output, nor in cache directory, e.g. when a
+    source is created. Sources may be in output_dir as well.
+    """
+    cache_dir = cache.directory.resolve() if cache is not None else None
+
+    def list_targets() -> dict[Path, tuple[Path, Path]]:
+        return {
+            source.resolve(): (source, target)
+            for source, target in collect_sources(sources, output_dir).items()
+        }
+
+    def is_unknown(path: Path) -> bool:
+        return not (
+            path in known or
+            path in outputs or
+            cache_dir is not None and path.is_relative_to(cache_dir)
+        )
+
+    known = list_targets()
+    outputs = {target.resolve() for _, target in known.values()}
+    for changed in changes:
+        start = time.perf_counter()
+        if any(map(is_unknown, changed)):
+            known = list_targets()
+            outputs = {target.resolve() for _, target in known.values()}
+        targets = dict(known[path] for path in changed if path in known)
+        if not targets:
+            continue
+        results = [
+            transpile_file(source, target, cache)
+            for source, target in targets.items()
+        ]
+        report(targets, results, cache)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f'done in {elapsed:.1f} ms, watching for changes', flush=True)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = get_parser()
+    args = parser.parse_intermixed_args(argv)
+    if args.jobs < 0:
+        parser.error('number of jobs must not be negative')
+    jobs = args.jobs or os.cpu_count() or 1
+
+    targets = collect_sources(args.sources, args.output_dir)
+    if not targets and not args.watch:
+        parser.error('no source files found')
+    sources_of: dict[Path, list[Path]] = {}
+    for source, target in targets.items():
+        sources_of.setdefault(target, []).append(source)
+    for target, sources in sources_of.items():
+        if len(sources) > 1:
+            parser.error(
+                f'{", ".join(map(str, sources))} would be written to '
+                f'{target}, transpile them into different directories'
+            )
+
+    cache = None
+    if not args.no_cache:
+        cache = BuildCache(args.cache_dir, transpiler_fingerprint())
+        # checked once here, rather than failing in every worker
+        if not cache.usable():
+            cache = None
+
+    if args.watch:
+        # started before the first build, so sources saved during it are
+        # transpiled again
+        changes = watch_changes(
+            args.sources,
+            lambda: collect_sources(args.sources, args.output_dir),
+            force_polling=args.poll,
+        )
+    failed = report(targets, run(targets, jobs, cache), cache)
+    if not args.watch:
+        return 1 if failed else 0
+
+    print('watching for changes, press Ctrl+C to stop', flush=True)
+    try:
+        watch(args.sources, args.output_dir, cache, changes)
+    except KeyboardInterrupt:
+        pass
+    return 0
@@ -1,5 +1,10 @@
+from io import StringIO
+from string import Formatter
+from typing import TextIO
 from transpiler.base import TranspilerEnum
 from transpiler.tree import Node
+from transpiler.lexer import unquote
+from transpiler.symbol_table import SymbolTable
 from transpiler.settings import Tag, NT, SHARP_TOKENS
 
 
@@ -24,6 +29,35 @@ class SharpVarType(TranspilerEnum):
             return cls.BOOL
 
 
+class OutputWriter:
+    """
+    Text accumulated as a list of fragments, so appending does not copy
+    what was written before. Last characters are tracked separately for
+    callers which decide on separators by what was written last.
+    """
+
+    __slots__ = ('fragments', 'tail')
+
+    TAIL_SIZE = 2
+
+    def __init__(self, text: str = ''):
+        self.fragments: list[str] = []
+        self.tail = ''
+        self.write(text)
+
+    def write(self, text: str):
+        if text:
+            self.fragments.append(text)
+            self.tail = (self.tail + text)[-self.TAIL_SIZE:]
+
+    def write_to(self, stream: TextIO):
+        for fragment in self.fragments:
+            stream.write(fragment)
+
+    def getvalue(self) -> str:
+        return ''.join(self.fragments)
+
+
 class CodeGenerator:
 
     main_template = """
@@ -42,15 +76,15 @@ namespace Transpiler
     def __init__(self, source_code: str):
         self.source_code = source_code
         self.node = None
-        self.vars_dict = {}
+        self.symbol_table = SymbolTable()
         self.siblings = []
         self.current_scope = 0
         self.current_call_args_scope = 0
         self.tabs = ""
 
-        self.libs = "using System;\n"
-        self.global_vars = ""
-        self.main_code = ""
+        self.libs = OutputWriter("using System;\n")
+        self.global_vars = OutputWriter()
+        self.main_code = OutputWriter()
 
         self.for_statement = ""
         self.for_parts = {
@@ -65,78 +99,71 @@ namespace Transpiler
         self.is_inside_command = False
         self.is_inside_for_declaration = False
         self.is_char_declaration = False
-        self.is_in_string = False
 
     def add_token(self, node: Node,
                   siblings: list[Node],
-                  vars_dict,
-                  current_scope,
+                  symbol_table: SymbolTable,
                   right_terminals):
         self.node = node
         self.siblings = siblings
-        self.vars_dict = vars_dict
-        self.current_scope = current_scope
-        self.tabs = " " * 8 + (" " * 4) * current_scope
-
-        if node.tag is Tag.QUOTE:
-            self.is_in_string = not self.is_in_string
+        self.symbol_table = symbol_table
+        self.current_scope = symbol_table.depth
+        self.tabs = " " * 8 + (" " * 4) * self.current_scope
 
-        if node.tag in [Tag.SEMICOLON, Tag.THEN, Tag.DO]\
-                and not self.is_in_string:
+        if node.tag in [Tag.SEMICOLON, Tag.THEN, Tag.DO]:
             self.is_inside_command = False
             self.is_char_declaration = False
             if node.tag is Tag.SEMICOLON:
                 if self.is_global_vars:
-                    self.global_vars += ";\n"
+                    self.global_vars.write(";\n")
                 else:
-                    if self.main_code[-2] != "}":
-                        self.main_code += ";\n"
+                    if self.main_code.tail[-2] != "}":
+                        self.main_code.write(";\n")
             if node.tag is Tag.DO and self.is_inside_for_declaration:
                 self.is_inside_for_declaration = False
-                self.main_code += \
+                self.main_code.write(
                     self.for_statement.format(self.for_parts["first"],
                                               self.for_parts["second"],
                                               self.for_parts["third"])
+                )
 
-        if node.tag is Tag.BEGIN and not self.is_in_string:
+        if node.tag is Tag.BEGIN:
             self.is_global_vars = False
-            self.main_code += self.tabs + "{\n"
+            self.main_code.write(self.tabs + "{\n")
 
-        if node.tag is Tag.END and not self.is_in_string:
-            self.main_code += self.tabs + "}\n"
+        if node.tag is Tag.END:
+            self.main_code.write(self.tabs + "}\n")
 
-        if node.tag is Tag.VAR and not self.is_in_string:
+        if node.tag is Tag.VAR:
             if self.is_inside_for_declaration:
                 var_name = self.siblings[1].token.value
                 right_terminals = \
-                    self.vars_dict[current_scope][var_name]['expr']
+                    self.symbol_table.resolve(var_name)['expr']
             self.var_handling(right_terminals)
 
-        if node.tag is Tag.IF and not self.is_in_string:
+        if node.tag is Tag.IF:
             self.if_handling(right_terminals)
 
-        if node.tag is Tag.ELSE and not self.is_in_string:
+        if node.tag is Tag.ELSE:
             self.else_handling()
 
-        if node.tag is Tag.FOR and not self.is_in_string:
+        if node.tag is Tag.FOR:
             self.for_handling()
 
-        if node.tag in [Tag.TO, Tag.DOWNTO] and not self.is_in_string:
+        if node.tag in [Tag.TO, Tag.DOWNTO]:
             expression_string = self.parse_expression(right_terminals)
             self.for_parts["second"] += expression_string
 
-        if node.tag is Tag.WHILE and not self.is_in_string:
+        if node.tag is Tag.WHILE:
             self.while_handling(right_terminals)
 
-        if node.tag is Tag.REPEAT and not self.is_in_string:
+        if node.tag is Tag.REPEAT:
             self.repeat_handling(right_terminals)
 
-        if node.tag is Tag.UNTIL and not self.is_in_string:
+        if node.tag is Tag.UNTIL:
             self.until_handling()
 
-        if node.tag is Tag.ID \
-                and not self.is_in_string \
-                and not self.is_inside_command:
+        if node.tag is Tag.ID and not self.is_inside_command:
             if self.is_func():
                 self.function_handling(right_terminals)
             else:
@@ -165,30 +192,20 @@ namespace Transpiler
 
         elif self.is_global_vars:
             if len(var_expr) == 0:
-                self.global_vars += " " * 8 + \
-                                    "static " + \
-                                    self.define_var_without_value(var_type,
-                                                                  var_name)
+                define_var = self.define_var_without_value(var_type, var_name)
             else:
-                self.global_vars += " " * 8 + \
-                                    "static " + \
-                                    self.define_var_with_value(var_type,
-                                                               var_name,
-                                                               right_terminals)
+                define_var = self.define_var_with_value(var_type,
+                                                        var_name,
+                                                        right_terminals)
+            self.global_vars.write(" " * 8 + "static " + define_var)
         else:
             if len(var_expr) == 0:
-                self.main_code += self.tabs + " " * 4 \
-                    + self.define_var_without_value(
-                        var_type,
-                        var_name
-                    )
+                define_var = self.define_var_without_value(var_type, var_name)
             else:
-                self.main_code += self.tabs + " " * 4 \
-                    + self.define_var_with_value(
-                        var_type,
-                        var_name,
-                        right_terminals
-                    )
+                define_var = self.define_var_with_value(var_type,
+                                                        var_name,
+                                                        right_terminals)
+            self.main_code.write(self.tabs + " " * 4 + define_var)
 
     def if_handling(self, right_terminals):
         self.is_inside_command = True
@@ -196,18 +213,18 @@ namespace Transpiler
         if len(self.siblings) != 2:
             if_statement = self.tabs + if_statement
         expression_string = self.parse_expression(right_terminals)
-        self.main_code += if_statement.format(expression_string)
+        self.main_code.write(if_statement.format(expression_string))
 
     def else_handling(self):
         self.is_inside_command = False
-        if self.main_code[-1] != "\n":
-            self.main_code += ";\n"
+        if self.main_code.tail[-1] != "\n":
+            self.main_code.write(";\n")
 
-        self.main_code += self.tabs + "else"
+        self.main_code.write(self.tabs + "else")
         if self.siblings[1].children[0].tag is not Tag.IF:
-            self.main_code += '\n'
+            self.main_code.write('\n')
         else:
-            self.main_code += ' '
+            self.main_code.write(' ')
 
     def for_handling(self):
         self.is_inside_command = True
@@ -224,37 +241,30 @@ namespace Transpiler
     def id_handling(self, right_terminals):
         self.is_inside_command = True
 
-        for i in range(self.current_scope, -1, -1):
-            scoped_vars = self.vars_dict.get(i)
-            if not scoped_vars:
-                continue
-            var_data = scoped_vars.get(self.node.token.value)
-            if not var_data:
-                continue
-            else:
-                if var_data["type"].value == "char":
-                    self.is_char_declaration = True
+        var_data = self.symbol_table.resolve(self.node.token.value)
+        if var_data is not None and var_data["type"].value == "char":
+            self.is_char_declaration = True
 
         assign_var = self.tabs + " " * 4 + "{0} = {1}"
         var_name = self.node.token.value
         expression_string = self.parse_expression(right_terminals)
-        self.main_code += assign_var.format(var_name, expression_string)
+        self.main_code.write(assign_var.format(var_name, expression_string))
 
     def function_handling(self, right_terminals):
         self.is_inside_command = True
         func_args = self.parse_expression(right_terminals)
         func_name = SHARP_TOKENS.get(self.node.token.value,
                                      self.node.token.value)
-        self.main_code += self.tabs + 4 * ' ' + f'{func_name}{func_args}'
+        self.main_code.write(self.tabs + 4 * ' ' + f'{func_name}{func_args}')
 
     def while_handling(self, right_terminals):
         self.is_inside_command = True
         while_statement = self.tabs + "while ({0})\n"
         expression_string = self.parse_expression(right_terminals)
-        self.main_code += while_statement.format(expression_string)
+        self.main_code.write(while_statement.format(expression_string))
 
     def repeat_handling(self, right_terminals):
-        self.main_code += self.tabs + "do {\n"
+        self.main_code.write(self.tabs + "do {\n")
         self.until_expr = self.tabs + "}} while ({0})"
 
         expression_string = self.parse_expression(right_terminals)
@@ -262,7 +272,7 @@ namespace Transpiler
 
     def until_handling(self):
         self.is_inside_command = True
-        self.main_code += self.until_expr
+        self.main_code.write(self.until_expr)
 
     def define_var_without_value(self, var_type, var_name):
         define_var = "{0} {1}"
@@ -286,16 +296,10 @@ namespace Transpiler
         return define_var
 
     def parse_expression(self, right_terminals) -> str:
-        quote_flag = False
         result = []
-        for i, terminal in enumerate(right_terminals):
-            if quote_flag:
-                if terminal.tag is Tag.QUOTE:
-                    quote_flag = False
-                continue
-            if terminal.tag is Tag.QUOTE:
+        for terminal in right_terminals:
+            if terminal.tag is Tag.STRING:
                 result.append(self.get_string(terminal))
-                quote_flag = True
             else:
                 result.append(self.to_sharp(terminal))
 
@@ -307,7 +311,7 @@ namespace Transpiler
             return f" {value} "
         elif node.tag is Tag.BOOLEAN_NOT:
             value = SHARP_TOKENS.get(node.token.value, node.token.value)
-            if self.main_code[-1] != ' ':
+            if self.main_code.tail[-1] != ' ':
                 return f"{value}"
             return f" {value}"
         elif node.tag is Tag.COMMA:
@@ -319,25 +323,34 @@ namespace Transpiler
             return value
 
     def get_string(self, node: Node) -> str:
-        pos = node.token.pos
-        string = self.source_code[pos:self.source_code.index("'",
-                                                             node.token.pos)]
+        string = unquote(node.token.value).replace('\\', '\\\\')
         if self.is_char_declaration:
-            return f"'{string}'"
-        return f'"{string}"'
-
-    def get_result(self):
+            return "'{}'".format(string.replace("'", "\\'"))
+        return '"{}"'.format(string.replace('"', '\\"'))
+
+    def write_result(self, stream: TextIO):
+        """
+        Write resulting program to text stream section by section, without
+        building it as a single string.
+        """
         if self.source_code == '':
-            return ''
-        return self.main_template.format(self.libs,
-                                         self.global_vars,
-                                         self.main_code)
+            return
+        sections = (self.libs, self.global_vars, self.main_code)
+        for literal, field, _, _ in Formatter().parse(self.main_template):
+            stream.write(literal)
+            if field is not None:
+                sections[int(field)].write_to(stream)
+
+    def get_result(self) -> str:
+        buffer = StringIO()
+        self.write_result(buffer)
+        return buffer.getvalue()
 
     def get_libs(self):
-        return self.libs
+        return self.libs.getvalue()
 
     def get_global_vars(self):
-        return self.global_vars
+        return self.global_vars.getvalue()
 
     def get_main_code(self):
-        return self.main_code
+        return self.main_code.getvalue()
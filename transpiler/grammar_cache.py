@@ -0,0 +1,135 @@
+"""
+On-disk cache of FIRST/FOLLOW sets and LL(1) predict table.
+
+Build it ahead of time with
+
+    python -m transpiler.build_grammar
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from transpiler.base import (
+    GrammarRule,
+    NormalizedGrammarRule,
+    Special,
+    Symbol,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+FORMAT_VERSION = 1
+
+
+def symbol_key(symbol: Symbol) -> str:
+    return f'{symbol.__class__.__name__}.{symbol.value}'
+
+
+def collect_symbols(rules: list[GrammarRule]) -> dict[str, Symbol]:
+    symbols = {symbol_key(symbol): symbol for symbol in Special}
+    for rule in rules:
+        symbols[symbol_key(rule.left)] = rule.left
+        for chain in rule.right:
+            for symbol in chain:
+                symbols[symbol_key(symbol)] = symbol
+    return symbols
+
+
+def fingerprint(rules: list[GrammarRule]) -> str:
+    """
+    Hash of grammar rules which does not depend on set ordering.
+    """
+    data = [
+        [symbol_key(rule.left),
+         sorted([symbol_key(symbol) for symbol in chain]
+                for chain in rule.right)]
+        for rule in rules
+    ]
+    raw = json.dumps([FORMAT_VERSION, data], separators=(',', ':'))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def dump(path: Path, rules: list[GrammarRule], first: dict, follow: dict,
+         predict_table: dict) -> None:
+    keys = sorted(collect_symbols(rules))
+    index = {key: idx for idx, key in enumerate(keys)}
+
+    def encode_sets(sets: dict) -> list:
+        return sorted(
+            [index[symbol_key(left)],
+             sorted(index[symbol_key(symbol)] for symbol in right)]
+            for left, right in sets.items()
+        )
+
+    predict = sorted(
+        [index[symbol_key(left)], index[symbol_key(term)],
+         [index[symbol_key(symbol)] for symbol in rule.right]]
+        for left, row in predict_table.items()
+        for term, rule in row.items()
+    )
+    data = {
+        'fingerprint': fingerprint(rules),
+        'symbols': keys,
+        'first': encode_sets(first),
+        'follow': encode_sets(follow),
+        'predict': predict,
+    }
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            json.dump(data, file, separators=(',', ':'))
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def load(path: Path, rules: list[GrammarRule]) \
+        -> tuple[dict, dict, dict] | None:
+    """
+    Return (first, follow, predict_table) or None if cache is missing,
+    broken or was built for another grammar.
+    """
+    try:
+        with open(path, encoding='utf-8') as file:
+            data = json.load(file)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(data, dict) \
+            or data.get('fingerprint') != fingerprint(rules):
+        logger.debug(f'grammar cache {path} is outdated')
+        return None
+
+    known_symbols = collect_symbols(rules)
+    try:
+        symbols = [known_symbols[key] for key in data['symbols']]
+
+        def decode_sets(sets: list) -> dict:
+            return {
+                symbols[left]: {symbols[idx] for idx in right}
+                for left, right in sets
+            }
+
+        first = decode_sets(data['first'])
+        follow = decode_sets(data['follow'])
+        predict_table = {}
+        for left, term, chain in data['predict']:
+            rule = NormalizedGrammarRule(
+                symbols[left],
+                tuple(symbols[idx] for idx in chain),
+            )
+            predict_table.setdefault(symbols[left], {})[symbols[term]] = rule
+    except (KeyError, IndexError, TypeError, ValueError):
+        logger.debug(f'grammar cache {path} is broken')
+        return None
+
+    return first, follow, predict_table
@@ -2,18 +2,30 @@ import logging
 import re
 from sty import fg
 from transpiler.base import (
-    WHITESPACE,
     TranspilerError,
     Token,
     Special,
     Terminal
 )
 from transpiler.settings import LEXER_REGEX_FLAGS
+from transpiler.trace import Tracer
 
 
 logger = logging.getLogger(__name__)
 
 
+WHITESPACE_GROUP = '__WHITESPACE__'
+UNEXPECTED_GROUP = '__UNEXPECTED__'
+
+
+def unquote(literal: str) -> str:
+    """
+    Value of string literal token: without enclosing quotes and with
+    doubled quotes replaced by single ones.
+    """
+    return literal[1:-1].replace("''", "'")
+
+
 class LexerError(TranspilerError):
     pass
 
@@ -25,6 +37,11 @@ class UnexpectedTokenError(LexerError):
 class Lexer:
     """
     Token parser from code sequence.
+
+    Whole buffer is scanned with a single master regex. Whitespace and
+    any tag containing '__' (comments) are matched as ordinary groups and
+    skipped, and any character no rule accepts falls into the last group
+    and is reported as unexpected.
     """
 
     def __init__(
@@ -32,62 +49,64 @@ class Lexer:
         terminal_cls: type[Terminal],
         rules: list,
         filepath: str | None = None,
+        tracer: Tracer | None = None,
     ):
         self.terminal_cls = terminal_cls
-        parts = [f'(?P<{rule.tag.value}>{rule.regex})' for rule in rules]
+        parts = [f'(?P<{WHITESPACE_GROUP}>\\s+)']
+        parts += [f'(?P<{rule.tag.value}>{rule.regex})' for rule in rules]
+        parts += [f'(?P<{UNEXPECTED_GROUP}>[\\d\\D])']
         self.regex = re.compile('|'.join(parts), flags=LEXER_REGEX_FLAGS)
-        self.pos: int = 0
-        self.line: int = 1
-        self.line_pos: int = 1
+
+        # group name -> tag, None for groups which are not yielded
+        self.tags: dict[str, Terminal | None] = {WHITESPACE_GROUP: None}
+        for rule in rules:
+            tag = rule.tag
+            self.tags[tag.value] = None if '__' in tag.value else tag
 
         self.buffer: str | None = None
-        self.buffer_length: int = -1
 
         self.filepath = filepath
+        self.tracer = tracer
 
     @property
     def tokens(self):
         assert self.buffer is not None, 'nothing to tokenize'
-        self.buffer_length = len(self.buffer)
+        buffer = self.buffer
+        tags = self.tags
+        line = 1
+        line_start = 0
 
-        while (token := self._parse_token()):
-            if '__' not in token.tag.value:
-                yield token
-        yield Token(Special.LIMITER, Special.LIMITER.value, -1, -1)
+        debug = logger.isEnabledFor(logging.DEBUG)
+        tracer = self.tracer
 
-        self.buffer = None
-        self.buffer_length = -1
+        for cursor in self.regex.finditer(buffer):
+            group = cursor.lastgroup
+            value = cursor.group()
+            start = cursor.start()
+
+            if group == UNEXPECTED_GROUP:
+                msg = f"{value} at line {line}"
+                if self.filepath is not None:
+                    msg += f" ({self.filepath}:{line})"
+                raise UnexpectedTokenError(msg)
+
+            tag = tags[group]
+            if tag is not None:
+                token = Token(tag, value, start + 1, line,
+                              start - line_start + 1)
+                if debug:
+                    logger.debug(
+                        f'parsed token {fg.li_green}{token}{fg.rs} at line '
+                        f'{token.line} ({group})'
+                    )
+                if tracer is not None:
+                    tracer.record('lex', token)
+                yield token
 
-    def _parse_token(self) -> Token | None:
-        if self.pos > self.buffer_length:
-            return None
+            if '\n' in value:
+                line += value.count('\n')
+                line_start = buffer.rfind('\n', start, cursor.end()) + 1
 
-        cursor = WHITESPACE.search(self.buffer, self.pos)
-        if cursor is None:
-            return None
+        yield Token(Special.LIMITER, Special.LIMITER.value, -1, -1, -1)
 
-        self.pos = cursor.start()
-        cursor = self.regex.match(self.buffer, self.pos)
-        if cursor:
-            group = cursor.lastgroup
-            token = Token(
-                self.terminal_cls(group),
-                cursor.group(group),
-                self.pos + 1,
-                self._get_line()
-            )
-            logger.debug(
-                f'parsed token {fg.li_green}{token}{fg.rs} at line '
-                f'{token.line} ({group})'
-            )
-            self.pos = cursor.end()
-            return token
-
-        line = self._get_line()
-        msg = f"{self.buffer[self.pos]} at line {line}"
-        if self.filepath is not None:
-            msg += f" ({self.filepath}:{line})"
-        raise UnexpectedTokenError(msg)
-
-    def _get_line(self):
-        return self.buffer.count('\n', 0, self.pos) + 1
+        self.buffer = None
@@ -2,7 +2,13 @@ from transpiler.tree import SyntaxTree, Node
 from transpiler.settings import Tag, NT
 from transpiler.base import TranspilerError, TranspilerEnum
 from transpiler.code_generator import CodeGenerator
+from transpiler.lexer import unquote
+from transpiler.symbol_table import SymbolTable
+from transpiler.stats import PipelineStats, CountingStream, timed
 from abc import ABC
+from typing import TextIO
+import operator
+import time
 
 
 class VarType(TranspilerEnum):
@@ -168,7 +174,17 @@ class PascalChar(PascalString):
 
 
 class BaseType(ABC):
-    is_in_func: bool = False
+    """
+    Type checker of expression terminals.
+
+    Working state is kept on the instance, so every analysis creates its
+    own checkers and concurrent analyses do not share anything.
+    """
+
+    def __init__(self, symbol_table: SymbolTable):
+        self.symbol_table = symbol_table
+        self.expr: list[Node] = []
+        self.is_in_func = False
 
     @staticmethod
     def get_error_data(node: Node, expected_type: str):
@@ -179,64 +195,46 @@ class BaseType(ABC):
                 f'is not compatible with type {expected_type}'
         }
 
-    @classmethod
-    def assert_(cls, expr: list[Node], vars_dict: dict, current_scope: int):
-        cls.expr = expr
-        cls.vars_dict = vars_dict
-        cls.current_scope = current_scope
+    def assert_(self, expr: list[Node]):
+        self.expr = expr
+        self.is_in_func = False
         for node in expr:
-            cls.check_node(node)
+            self.check_node(node)
 
-    @classmethod
-    def check_node(cls, node: Node):
-        if cls.entered_func(node):
-            cls.is_in_func = True
-        elif cls.left_func(node):
-            cls.is_in_func = False
+    def check_node(self, node: Node):
+        if self.entered_func(node):
+            self.is_in_func = True
+        elif self.left_func(node):
+            self.is_in_func = False
 
-    @classmethod
-    def entered_func(cls, node: Node) -> bool:
+    def entered_func(self, node: Node) -> bool:
         return node.tag is Tag.LBRACKET and node.parent.tag is NT.CALL
 
-    @classmethod
-    def left_func(cls, node: Node) -> bool:
+    def left_func(self, node: Node) -> bool:
         return node.tag is Tag.RBRACKET and node.parent.tag is NT.CALL
 
-    @classmethod
-    def is_var(cls, node: Node):
+    def is_var(self, node: Node):
         try:
             return node.parent.children[1].children[0].tag is not NT.CALL
         except IndexError:
             return True
 
-    @classmethod
-    def get_var_type(cls, node: Node) -> VarType:
-        for scope in range(cls.current_scope, -1, -1):
-            scoped_vars = cls.vars_dict.get(scope)
-            if not scoped_vars:
-                continue
-            var = scoped_vars.get(node.token.value)
-            if not var:
-                continue
-            return var["type"]
-        raise ValueError(f'cannot find variable: {node.token.value}')
+    def get_var_type(self, node: Node) -> VarType:
+        return self.symbol_table.get_type(node.token.value)
 
-    @classmethod
-    def is_type(cls, node: Node, types: list[VarType]) -> bool:
-        return cls.get_var_type(node) in types
+    def is_type(self, node: Node, types: list[VarType]) -> bool:
+        return self.get_var_type(node) in types
 
-    @classmethod
-    def is_defined(cls, node_id: Node):
+    def is_defined(self, node_id: Node):
         try:
-            cls.is_type(node_id, [])
+            self.is_type(node_id, [])
             return True
         except ValueError:
             return False
 
 
 class IntType(BaseType):
-    @classmethod
-    def check_node(cls, node: Node):
+    def check_node(self, node: Node):
         acceptable = [
             Tag.NUMBER_INT,
             Tag.MATH_OPERATOR,
@@ -245,17 +243,16 @@ class IntType(BaseType):
             Tag.COMMA,
         ]
         super().check_node(node)
-        assert cls.is_in_func or \
+        assert self.is_in_func or \
             node.tag in acceptable and node.token.value != '/' \
-            or node.tag is Tag.ID and cls.is_var(node) \
-            and cls.is_type(node, [VarType.INTEGER]) \
-            or not cls.is_var(node), \
-            cls.get_error_data(node, VarType.INTEGER)
+            or node.tag is Tag.ID and self.is_var(node) \
+            and self.is_type(node, [VarType.INTEGER]) \
+            or not self.is_var(node), \
+            self.get_error_data(node, VarType.INTEGER)
 
 
 class RealType(BaseType):
-    @classmethod
-    def check_node(cls, node: Node):
+    def check_node(self, node: Node):
         acceptable = [
             Tag.NUMBER_INT,
             Tag.NUMBER_FLOAT,
@@ -265,159 +262,302 @@ class RealType(BaseType):
             Tag.COMMA,
         ]
         super().check_node(node)
-        assert cls.is_in_func or \
+        assert self.is_in_func or \
             node.tag in acceptable \
             or node.tag is Tag.ID \
-            and cls.is_var(node) \
-            and cls.is_type(node, [VarType.INTEGER, VarType.REAL]) \
+            and self.is_var(node) \
+            and self.is_type(node, [VarType.INTEGER, VarType.REAL]) \
             or node.tag is Tag.ID \
-            and not cls.is_var(node), \
-            cls.get_error_data(node, VarType.REAL)
+            and not self.is_var(node), \
+            self.get_error_data(node, VarType.REAL)
 
 
 class CharType(BaseType):
-    @classmethod
-    def assert_(cls, expr: list[Node], vars_dict: dict, current_scope: int):
-        cls.vars_dict = vars_dict
-        cls.current_scope = current_scope
-
+    def assert_(self, expr: list[Node]):
         if expr[0].tag is Tag.ID:
-            assert not cls.is_var(expr[0]) \
-                or cls.is_type(expr[0], [VarType.CHAR]), \
-                cls.get_error_data(expr[0], VarType.CHAR)
+            assert not self.is_var(expr[0]) \
+                or self.is_type(expr[0], [VarType.CHAR]), \
+                self.get_error_data(expr[0], VarType.CHAR)
         else:
-            assert expr[0].tag == Tag.QUOTE, \
-                cls.get_error_data(expr[0], VarType.CHAR)
-            assert expr[-1].tag == Tag.QUOTE, \
-                cls.get_error_data(expr[0], VarType.CHAR)
-            assert len(expr) == 3 and len(expr[1].token.value) == 1, {
-                'node': expr[1],
+            assert expr[0].tag is Tag.STRING, \
+                self.get_error_data(expr[0], VarType.CHAR)
+            assert expr[-1].tag is Tag.STRING, \
+                self.get_error_data(expr[0], VarType.CHAR)
+            assert len(expr) == 1 and len(unquote(expr[0].token.value)) == 1, {
+                'node': expr[0],
                 'message': 'invalid char, ensure value length is strictly 1'
             }
 
 
 class StringType(BaseType):
-    @classmethod
-    def assert_(cls, expr: list[Node], vars_dict: dict, current_scope: int):
-        cls.is_string = False
-        super().assert_(expr, vars_dict, current_scope)
-
-    @classmethod
-    def check_node(cls, node: Node):
+    def check_node(self, node: Node):
         super().check_node(node)
-        if cls.is_in_func or node.tag is Tag.RBRACKET:
+        if self.is_in_func or node.tag in [Tag.RBRACKET, Tag.STRING]:
             return
-        if node.tag == Tag.QUOTE:
-            cls.is_string = not cls.is_string
-        elif not cls.is_string:
-            assert (node.token.value == "+") \
-                or node.tag == Tag.ID \
-                and cls.is_var(node) \
-                and cls.is_type(node, [VarType.CHAR, VarType.STRING]) \
-                or (node.tag is Tag.ID and not cls.is_var(node)), \
-                cls.get_error_data(node, VarType.STRING)
+        assert (node.token.value == "+") \
+            or node.tag == Tag.ID \
+            and self.is_var(node) \
+            and self.is_type(node, [VarType.CHAR, VarType.STRING]) \
+            or (node.tag is Tag.ID and not self.is_var(node)), \
+            self.get_error_data(node, VarType.STRING)
 
 
 class BooleanType(BaseType):
-    @classmethod
-    def check_node(cls, node: Node):
-        if node.tag == Tag.QUOTE:
-            cls.is_string = not cls.is_string
-        if not cls.is_string and node.tag is Tag.ID:
-            assert not cls.is_var(node) \
-                or cls.is_defined(node), \
-                cls.get_error_data(node, VarType.BOOLEAN)
+    def assert_(self, expr: list[Node]):
+        self.expr = expr
+        self._parse_expr()
 
-    @classmethod
-    def assert_(cls, expr: list[Node], vars_dict: dict, current_scope: int):
-        cls.is_string = False
-        super().assert_(expr, vars_dict, current_scope)
-        cls._parse_expr()
-
-    @classmethod
-    def _parse_expr(cls):
-        cls.is_string = False
-
-        def parse_node(node: Node):
-            if node.tag is Tag.QUOTE:
-                if cls.is_string:
-                    value = 'PascalString()'
-                else:
-                    value = ''
-                cls.is_string = not cls.is_string
-                return value
-            if cls.is_string:
-                return ''
-            if node.tag in [Tag.BOOLEAN_VALUE]:
-                return 'True'
-            if node.tag is Tag.ID and not cls.is_string:
-                if cls.is_var(node):
-                    var_type = cls.get_var_type(node)
-                    if var_type is VarType.BOOLEAN:
-                        return 'True'
-                    elif var_type is VarType.INTEGER:
-                        return 'PascalInt()'
-                    elif var_type is VarType.REAL:
-                        return 'PascalReal()'
-                    elif var_type is VarType.STRING:
-                        return 'PascalString()'
-                    elif var_type is VarType.CHAR:
-                        return 'PascalChar()'
-                return 'PascalAnyComparable'
-            if node.tag is Tag.NUMBER_INT:
-                return 'PascalInt()'
-            if node.tag is Tag.NUMBER_FLOAT:
-                return 'PascalReal()'
-            if node.token.value == '=':
-                return '=='
-            if node.token.value == '<>':
-                return '!='
-            return node.token.value
+    def _parse_expr(self):
+        # variable defined without value
+        if not self.expr:
+            return
 
         error_data = {
-            'node': cls.expr[0],
+            'node': self.expr[0],
             'message': 'expression is not compatible with type boolean'
         }
         try:
-            str_expr = ' '.join(map(parse_node, cls.expr))
-            internal_vars = {}
-            exec(f'exec_result = {str_expr}', globals(), internal_vars)
+            result = ExpressionEvaluator(self._get_operands()).evaluate()
             assert isinstance(
-                internal_vars['exec_result'],
+                result,
                 (bool, PascalAnyComparable)
             ), error_data
         except TypeError:
             raise AssertionError(error_data)
 
+    def _get_operands(self) -> list:
+        """
+        Replace literals and variables of expression with values of their
+        types, keep operators and brackets as lowercase strings. Function
+        name is replaced with PascalAnyComparable which is called with
+        evaluated arguments. Asserts that variables are defined.
+        """
+        operands = []
+        for node in self.expr:
+            if node.tag is Tag.STRING:
+                operands.append(PascalString())
+            elif node.tag is Tag.BOOLEAN_VALUE:
+                operands.append(True)
+            elif node.tag is Tag.ID:
+                if self.is_var(node):
+                    try:
+                        var_type = self.get_var_type(node)
+                    except ValueError:
+                        raise AssertionError(
+                            self.get_error_data(node, VarType.BOOLEAN)
+                        )
+                    operands.append(VAR_TYPE_VALUES[var_type]())
+                else:
+                    operands.append(PascalAnyComparable)
+            elif node.tag is Tag.NUMBER_INT:
+                operands.append(PascalInt())
+            elif node.tag is Tag.NUMBER_FLOAT:
+                operands.append(PascalReal())
+            else:
+                operands.append(node.token.value.lower())
+        return operands
+
+
+VAR_TYPE_VALUES = {
+    VarType.BOOLEAN: lambda: True,
+    VarType.INTEGER: PascalInt,
+    VarType.REAL: PascalReal,
+    VarType.STRING: PascalString,
+    VarType.CHAR: PascalChar,
+}
+
+
+class ExpressionEvaluator:
+    """
+    Evaluates expression on values of operand types (see _get_operands of
+    BooleanType). Pascal* classes define which operations are allowed
+    between types and raise TypeError for the rest.
+
+    Precedence from lowest: or/xor, and, not, comparisons (chained),
+    +/-, * and /. `and`, `or` and chained comparisons short-circuit on
+    truthiness of the left part, so the right part is parsed but not
+    evaluated.
+    """
+
+    BINARY_OPERATORS = {
+        '+': operator.add,
+        '-': operator.sub,
+        '*': operator.mul,
+        '/': operator.truediv,
+    }
+    COMPARISONS = {
+        '=': operator.eq,
+        '<>': operator.ne,
+        '<': operator.lt,
+        '>': operator.gt,
+        '<=': operator.le,
+        '>=': operator.ge,
+    }
+
+    def __init__(self, operands: list):
+        self.operands = operands
+        self.pos = 0
+
+    def evaluate(self):
+        """
+        Return value of expression. Raise TypeError if operation is not
+        allowed or expression is malformed.
+        """
+        result = self._or(True)
+        if self.pos != len(self.operands):
+            raise TypeError(f'unexpected {self._peek()}')
+        return result
+
+    def _peek(self):
+        if self.pos < len(self.operands):
+            return self.operands[self.pos]
+        return None
+
+    def _next(self):
+        if self.pos >= len(self.operands):
+            raise TypeError('unexpected end of expression')
+        self.pos += 1
+        return self.operands[self.pos - 1]
+
+    def _expect(self, value: str):
+        item = self._next()
+        if not isinstance(item, str) or item != value:
+            raise TypeError(f'{value} expected')
+
+    def _is_operator(self, values) -> bool:
+        item = self._peek()
+        return type(item) is str and item in values
+
+    def _or(self, evaluate: bool):
+        left = self._and(evaluate)
+        while self._is_operator(('or', 'xor')):
+            if self._next() == 'or':
+                short = evaluate and bool(left)
+                right = self._and(evaluate and not short)
+                if evaluate and not short:
+                    left = right
+            else:
+                right = self._and(evaluate)
+                if evaluate:
+                    left = bool(left) != bool(right)
+        return left
+
+    def _and(self, evaluate: bool):
+        left = self._not(evaluate)
+        while self._is_operator(('and',)):
+            self._next()
+            short = evaluate and not left
+            right = self._not(evaluate and not short)
+            if evaluate and not short:
+                left = right
+        return left
+
+    def _not(self, evaluate: bool):
+        if self._is_operator(('not',)):
+            self._next()
+            value = self._not(evaluate)
+            return not value if evaluate else None
+        return self._comparison(evaluate)
+
+    def _comparison(self, evaluate: bool):
+        left = self._sum(evaluate)
+        result = left
+        chained = False
+        while self._is_operator(self.COMPARISONS):
+            compare = self.COMPARISONS[self._next()]
+            if chained and evaluate and not result:
+                evaluate = False
+            right = self._sum(evaluate)
+            if evaluate:
+                result = compare(left, right)
+            left = right
+            chained = True
+        return result
+
+    def _sum(self, evaluate: bool):
+        left = self._product(evaluate)
+        while self._is_operator(('+', '-')):
+            operation = self.BINARY_OPERATORS[self._next()]
+            right = self._product(evaluate)
+            if evaluate:
+                left = operation(left, right)
+        return left
+
+    def _product(self, evaluate: bool):
+        left = self._atom(evaluate)
+        while self._is_operator(('*', '/')):
+            operation = self.BINARY_OPERATORS[self._next()]
+            right = self._atom(evaluate)
+            if evaluate:
+                left = operation(left, right)
+        return left
+
+    def _atom(self, evaluate: bool):
+        item = self._next()
+        if item is PascalAnyComparable:
+            self._expect('(')
+            args = []
+            if not self._is_operator((')',)):
+                args.append(self._or(evaluate))
+                while self._is_operator((',',)):
+                    self._next()
+                    args.append(self._or(evaluate))
+            self._expect(')')
+            return PascalAnyComparable(*args) if evaluate else None
+        if not isinstance(item, str):
+            return item
+        if item == 'not':
+            value = self._atom(evaluate)
+            return not value if evaluate else None
+        if item == '(':
+            value = self._or(evaluate)
+            self._expect(')')
+            return value
+        raise TypeError(f'unexpected {item}')
+
 
 class SemanticAnalyzer:
     def __init__(self, tree: SyntaxTree,
                  source_code: str,
-                 filepath: str | None = None):
+                 filepath: str | None = None,
+                 stats: PipelineStats | None = None):
         self.tree = tree
         self.filepath = filepath
-        self._visited_nodes = {}
+        self.stats = stats
         self.code_generator = CodeGenerator(source_code)
-
-        # 0 for global scope variables
-        # 1 for nested if/for/while/until
-        # 2 for subnested and so on
-        self.current_scope = 0
-        self.vars_dict = {self.current_scope: {}}
-        self.__is_in_string = False
+        self.symbol_table = SymbolTable()
+        self.type_checkers: dict[VarType, BaseType] = {
+            VarType.INTEGER: IntType(self.symbol_table),
+            VarType.REAL: RealType(self.symbol_table),
+            VarType.CHAR: CharType(self.symbol_table),
+            VarType.STRING: StringType(self.symbol_table),
+            VarType.BOOLEAN: BooleanType(self.symbol_table),
+        }
         self.right_terminals = []
 
-        self.__is_in_string_perform_assertions = False
-
-        self.should_clear_vars_dict = False
+        self.should_leave_scope = False
 
         self.else_flag = False
 
-    def parse(self):
+    @property
+    def current_scope(self) -> int:
+        return self.symbol_table.depth
+
+    def parse(self, output: TextIO | None = None) -> str | None:
+        """
+        Return resulting C# code, or write it to output text stream and
+        return None. Nothing is written if analysis fails.
+        """
+        stats = self.stats
+        if stats is not None:
+            stats.nodes += self.tree.count_nodes()
+            self.code_generator.add_token = timed(
+                self.code_generator.add_token, stats, 'codegen')
+            # stats may already hold earlier transpilations
+            codegen_before = stats.seconds.get('codegen', 0.0)
+            start = time.perf_counter()
         try:
             self.dfs(self.tree.root, callback=self.perform_assertions)
-            self.tree.vars_dict = self.vars_dict
-            return self.code_generator.get_result()
         except AssertionError as error:
             node = error.args[0]["node"]
             if not isinstance(node.tag, Tag):
@@ -429,105 +569,108 @@ class SemanticAnalyzer:
             if self.filepath is not None:
                 msg += f" ({self.filepath}:{node.token.line})"
             raise SemanticError(msg) from error
-
-    def dfs(self, node: Node, siblings: list[Node] = None, callback=None):
-        siblings = siblings or []
-        callback_name = callback.__name__ if callback is not None else 'default'
-        visited = self._visited_nodes.get(callback_name)
-        if visited is None:
-            self._visited_nodes[callback_name] = {node.__hash__()}
+        finally:
+            if stats is not None:
+                codegen_seconds = (
+                    stats.seconds.get('codegen', 0.0) - codegen_before
+                )
+                stats.add_time(
+                    'semantic',
+                    time.perf_counter() - start - codegen_seconds,
+                )
+                stats.variables += self.symbol_table.declared
+
+        self.tree.symbol_table = self.symbol_table
+        if stats is not None:
+            return self._write_result_with_stats(output)
+        if output is not None:
+            self.code_generator.write_result(output)
+            return None
+        return self.code_generator.get_result()
+
+    def _write_result_with_stats(self, output: TextIO | None) -> str | None:
+        start = time.perf_counter()
+        if output is not None:
+            stream = CountingStream(output)
+            self.code_generator.write_result(stream)
+            result = None
+            self.stats.output_bytes += stream.bytes
         else:
-            self._visited_nodes[callback_name].add(node.__hash__())
-
-        if callback is not None:
-            callback(node, siblings)
+            result = self.code_generator.get_result()
+            self.stats.output_bytes += len(result.encode())
+        self.stats.add_time('codegen', time.perf_counter() - start)
+        return result
 
-        for child in node.children:
-            if child not in self._visited_nodes[callback_name]:
-                self.dfs(child, node.children, callback)
+    def dfs(self, node: Node, siblings: list[Node] = None, callback=None):
+        """
+        Pre-order traversal with an explicit stack, so depth of the tree is
+        not limited by interpreter recursion limit.
+        """
+        stack = [(node, siblings or [])]
+        while stack:
+            node, siblings = stack.pop()
+            if callback is not None:
+                callback(node, siblings)
+
+            stack.extend((child, node.children)
+                         for child in reversed(node.children))
 
     def perform_assertions(self, node: Node, siblings: list[Node] | None):
-
-        if node.tag is Tag.QUOTE:
-            self.__is_in_string_perform_assertions = \
-                not self.__is_in_string_perform_assertions
-        elif not self.__is_in_string_perform_assertions:
-
-            if node.tag is Tag.SEMICOLON \
-                    and siblings[0].tag \
-                    in [Tag.FOR, Tag.WHILE, Tag.REPEAT, Tag.IF]:
-                self.should_clear_vars_dict = True
-            elif node.tag in [Tag.FOR, Tag.IF, Tag.REPEAT, Tag.WHILE]:
-                if not (node.tag is Tag.IF and
-                        node.parent.tag is NT.ELSE_BLOCK_RIGHT):
-                    self.current_scope += 1
-                if node.tag is Tag.IF:
-                    abstract_expr_node = siblings[1].children[0]
-                elif node.tag is Tag.REPEAT:
-                    abstract_expr_node = siblings[3]
-                elif node.tag is Tag.WHILE:
-                    abstract_expr_node = siblings[1]
-
-                if node.tag is not Tag.FOR:
-                    self.assert_type_of_expression(abstract_expr_node)
-
-            elif node.tag is Tag.ELSE:
-                self.else_flag = True
-                self.should_clear_vars_dict = True
-                if siblings[1].children[0].tag is NT.COMPLEX_OP_BODY:
-                    child_else_block = siblings[2]
-                    assert not child_else_block.children, {
-                        'node': child_else_block.children[0],
-                        'message': 'multiple else blocks are not allowed'
-                    }
-
-            elif node.tag is Tag.ID and self._is_func_call(node):
-                self.build_right_terminals_for_func_call(node)
-
-            elif node.tag is NT.CALL_ARGS:
-                self.check_call_args_for_vars(node)
-            elif node.tag in [NT.DEFINE_VAR,
-                              NT.DEFINE_VAR_WITHOUT_SEMICOLON,
-                              NT.ABSTRACT_STATEMENT,
-                              NT.DEFINE_INLINE_VAR]:
-                self.assert_type_of_expression(node)
+        if node.tag is Tag.SEMICOLON \
+                and siblings[0].tag \
+                in [Tag.FOR, Tag.WHILE, Tag.REPEAT, Tag.IF]:
+            self.should_leave_scope = True
+        elif node.tag in [Tag.FOR, Tag.IF, Tag.REPEAT, Tag.WHILE]:
+            if not (node.tag is Tag.IF and
+                    node.parent.tag is NT.ELSE_BLOCK_RIGHT):
+                self.symbol_table.push_scope()
+            if node.tag is Tag.IF:
+                abstract_expr_node = siblings[1].children[0]
+            elif node.tag is Tag.REPEAT:
+                abstract_expr_node = siblings[3]
+            elif node.tag is Tag.WHILE:
+                abstract_expr_node = siblings[1]
+
+            if node.tag is not Tag.FOR:
+                self.assert_type_of_expression(abstract_expr_node)
+
+        elif node.tag is Tag.ELSE:
+            self.else_flag = True
+            self.should_leave_scope = True
+            if siblings[1].children[0].tag is NT.COMPLEX_OP_BODY:
+                child_else_block = siblings[2]
+                assert not child_else_block.children, {
+                    'node': child_else_block.children[0],
+                    'message': 'multiple else blocks are not allowed'
+                }
+
+        elif node.tag is Tag.ID \
+                and node.parent.tag is NT.ABSTRACT_STATEMENT \
+                and self._is_func_call(node):
+            self.build_right_terminals_for_func_call(node)
+
+        elif node.tag in [NT.DEFINE_VAR,
+                          NT.DEFINE_VAR_WITHOUT_SEMICOLON,
+                          NT.ABSTRACT_STATEMENT,
+                          NT.DEFINE_INLINE_VAR]:
+            self.assert_type_of_expression(node)
 
         if isinstance(node.tag, Tag):
             self.code_generator.add_token(node,
                                           siblings,
-                                          self.vars_dict,
-                                          self.current_scope,
+                                          self.symbol_table,
                                           self.right_terminals)
 
-        if self.should_clear_vars_dict:
-            self.vars_dict[self.current_scope] = {}
-            self.current_scope -= 1
+        if self.should_leave_scope:
+            self.symbol_table.pop_scope()
             if self.else_flag:
-                self.current_scope += 1
+                self.symbol_table.push_scope()
                 self.else_flag = False
-            self.should_clear_vars_dict = False
+            self.should_leave_scope = False
 
     def build_right_terminals_for_func_call(self, func_id_node: Node):
-        self.right_terminals = []
-        self._visited_nodes[self._collect_right_terminals.__name__] = set()
-        self.dfs(func_id_node.parent.children[1].children[0],
-                 callback=self._collect_right_terminals)
-
-    def check_call_args_for_vars(self, call_args_node: Node):
-        if call_args_node.children:
-            abstract_expr_node = call_args_node.children[0]
-            self.dfs(abstract_expr_node,
-                     callback=self._perform_call_args_assertions)
-
-    def _perform_call_args_assertions(self, node: Node, siblings: list[Node]):
-        if node.tag is Tag.QUOTE:
-            self.__is_in_string = not self.__is_in_string
-        elif not self.__is_in_string \
-                and node.tag is Tag.ID \
-                and not self._is_func_call(node):
-            self.assert_var_is_defined(node)
-        elif node.tag is NT.CALL_ARGS:
-            self.check_call_args_for_vars(node)
+        self.collect_right_terminals(
+            func_id_node.parent.children[1].children[0])
 
     def assert_type_of_expression(self, node: Node):
         assert_func = None
@@ -562,9 +705,7 @@ class SemanticAnalyzer:
     def _assert_abstract_expr_type(self,
                                    abstract_expr_node: Node,
                                    type: VarType):
-        self.right_terminals = []
-        self._visited_nodes[self._collect_right_terminals.__name__] = set()
-        self.dfs(abstract_expr_node, callback=self._collect_right_terminals)
+        self.collect_right_terminals(abstract_expr_node)
         self.assert_expr_type(abstract_expr_node, type)
 
     def _assert_type_of_define_var(self, node: Node):
@@ -572,10 +713,7 @@ class SemanticAnalyzer:
         self.assert_var_is_not_defined(left_var)
 
         optional_define_var_assignment_node = node.children[4]
-        self.right_terminals = []
-        self._visited_nodes[self._collect_right_terminals.__name__] = set()
-        self.dfs(optional_define_var_assignment_node,
-                 callback=self._collect_right_terminals)
+        self.collect_right_terminals(optional_define_var_assignment_node)
 
         self.save_var(left_var, type=node.children[3].token.value,
                       terminals=self.right_terminals)
@@ -592,18 +730,13 @@ class SemanticAnalyzer:
         }
 
         define_var_assignment_node = node.children[4]
-        self.right_terminals = []
-        self._visited_nodes[self._collect_right_terminals.__name__] = set()
-        self.dfs(define_var_assignment_node,
-                 callback=self._collect_right_terminals)
+        self.collect_right_terminals(define_var_assignment_node)
 
         self.save_var(left_var, node_type, terminals=self.right_terminals)
         self.assert_expr_type(left_var)
 
         abstract_expr_node = node.parent.children[3]
-        self.right_terminals = []
-        self._visited_nodes[self._collect_right_terminals.__name__] = set()
-        self.dfs(abstract_expr_node, callback=self._collect_right_terminals)
+        self.collect_right_terminals(abstract_expr_node)
 
         self.assert_expr_type(left_var)
 
@@ -612,28 +745,31 @@ class SemanticAnalyzer:
         self.assert_var_is_defined(left_var)
         abstract_statement_node = node.children[1]
 
-        self.right_terminals = []
-        self._visited_nodes[self._collect_right_terminals.__name__] = set()
-        self.dfs(abstract_statement_node,
-                 callback=self._collect_right_terminals)
-
-        self.assert_expr_type(left_var)
-
-    def _assert_type_of_abstract_expr(self, node: Node, left_var):
-        self.right_terminals = []
-        self._visited_nodes[self._collect_right_terminals.__name__] = set()
-        self.dfs(node, callback=self._collect_right_terminals)
+        self.collect_right_terminals(abstract_statement_node)
 
         self.assert_expr_type(left_var)
 
-    def _collect_right_terminals(self, node: Node, siblings: list[Node] = None):
-        if isinstance(node.tag, Tag) and node.tag is not Tag.ASSIGN:
-            self.right_terminals.append(node)
-            if node.tag is Tag.ID \
-                    and not (len(siblings) > 1 and
-                             siblings[1].tag is NT.STRING_PART):
-                if not self._is_func_call(node):
+    def collect_right_terminals(self, node: Node):
+        """
+        Collect terminals of expression subtree into right_terminals and
+        check that every variable in it is defined.
+
+        It is called only for the outermost expression of a statement, so
+        nested function calls and their arguments are checked here as well
+        and are not walked again on their own.
+        """
+        self.right_terminals = terminals = []
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if isinstance(node.tag, Tag):
+                if node.tag is Tag.ASSIGN:
+                    continue
+                terminals.append(node)
+                if node.tag is Tag.ID and not self._is_func_call(node):
                     self.assert_var_is_defined(node)
+            else:
+                stack.extend(reversed(node.children))
 
     def _is_func_call(self, id_node):
         try:
@@ -643,23 +779,10 @@ class SemanticAnalyzer:
 
     def assert_expr_type(self, node: Node, var_type: VarType = None):
         var_type = var_type or self.get_var_type(node)
-        if var_type == VarType.INTEGER:
-            IntType.assert_(self.right_terminals,
-                            self.vars_dict, self.current_scope)
-        elif var_type == VarType.REAL:
-            RealType.assert_(self.right_terminals,
-                             self.vars_dict, self.current_scope)
-        elif var_type == VarType.CHAR:
-            CharType.assert_(self.right_terminals,
-                             self.vars_dict, self.current_scope)
-        elif var_type == VarType.STRING:
-            StringType.assert_(self.right_terminals,
-                               self.vars_dict, self.current_scope)
-        elif var_type == VarType.BOOLEAN:
-            BooleanType.assert_(self.right_terminals,
-                                self.vars_dict, self.current_scope)
-        else:
+        type_checker = self.type_checkers.get(var_type)
+        if type_checker is None:
             raise ValueError(f'unknown type: {var_type}')
+        type_checker.assert_(self.right_terminals)
 
     def assert_var_is_defined(self, node_id):
         try:
@@ -681,19 +804,8 @@ class SemanticAnalyzer:
             pass
 
     def save_var(self, node, type, terminals):
-        scoped_vars = self.vars_dict.get(self.current_scope, {})
-        scoped_vars[node.token.value] = {'type': VarType.from_str(type),
-                                         'expr': terminals}
-        self.vars_dict[self.current_scope] = scoped_vars
+        self.symbol_table.declare(node.token.value,
+                                  VarType.from_str(type), terminals)
 
     def get_var_type(self, node: Node) -> VarType:
-        for i in range(self.current_scope, -1, -1):
-            scoped_vars = self.vars_dict.get(i)
-            if not scoped_vars:
-                continue
-            var_data = scoped_vars.get(node.token.value)
-            if not var_data:
-                continue
-            else:
-                return var_data["type"]
-        raise ValueError(f'variable is not defined: {node.token.value}')
+        return self.symbol_table.get_type(node.token.value)
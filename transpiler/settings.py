@@ -11,6 +11,12 @@ from transpiler.base import (
 )
 
 EXAMPLES_DIR = (Path(__file__).parent.parent / 'examples').resolve().absolute()
+GRAMMAR_CACHE_PATH = Path(os.getenv(
+    'GRAMMAR_CACHE_PATH',
+    Path(__file__).parent / 'grammar_cache.json',
+))
+# default directory of transpiled files cached by CLI
+BUILD_CACHE_DIR = Path(os.getenv('BUILD_CACHE_DIR', '.transpiler_cache'))
 
 
 logging.basicConfig(
@@ -19,6 +25,11 @@ logging.basicConfig(
 )
 
 
+# number of latest lexer and parser events kept for failed parses,
+# 0 disables tracing
+TRACE_BUFFER_SIZE = int(os.getenv('TRACE_BUFFER_SIZE', 0))
+
+
 LEXER_REGEX_FLAGS = re.IGNORECASE
 
 
@@ -34,7 +45,7 @@ class Tag(Terminal):
     COLON = 'colon'
     COMMA = 'comma'
     DOT = 'dot'
-    QUOTE = "quote"
+    STRING = 'string'
     TYPE_HINT = 'type_hint'
     COMPARE = 'compare'
     MATH_OPERATOR = 'math_operator'
@@ -80,9 +91,6 @@ class NT(NonTerminal):
 
     ABSTRACT_EXPR = 'ABSTRACT_EXPR'
 
-    STRING_EXPR = 'STRING_EXPR'
-    STRING_PART = 'STRING_PART'
-
     ABSTRACT_EXPR_RIGHT = 'ABSTRACT_EXPR_RIGHT'
     ABSTRACT_EXPR_VALUE = 'ABSTRACT_EXPR_VALUE'
     ABSTRACT_EXPR_OP = 'ABSTRACT_EXPR_OP'
@@ -162,7 +170,8 @@ LEXER_RULES = [
     LexerRule(Tag.COLON, r':'),
     LexerRule(Tag.COMMA, r','),
     LexerRule(Tag.DOT, r'\.'),
-    LexerRule(Tag.QUOTE, r"\'")
+    # quote inside of string literal is written twice
+    LexerRule(Tag.STRING, r"'[^']*(?:''[^']*)*'"),
 ]
 GRAMMAR_RULES = [
     GrammarRule(Special.START, {
@@ -211,16 +220,6 @@ GRAMMAR_RULES = [
         ),
     }),
 
-    # strings
-    GrammarRule(NT.STRING_EXPR, {
-        (Tag.QUOTE, NT.STRING_PART, Tag.QUOTE),
-    }),
-    GrammarRule(NT.STRING_PART,
-        {(Special.LAMBDA,)} |
-        # string may contain any tag except '
-        {(tag, NT.STRING_PART) for tag in Tag if tag is not Tag.QUOTE}
-    ),
-
     # boolean and math expressions
     GrammarRule(NT.ABSTRACT_EXPR, {
         (NT.ABSTRACT_EXPR_VALUE, NT.ABSTRACT_EXPR_RIGHT),
@@ -238,7 +237,7 @@ GRAMMAR_RULES = [
         (Tag.ID, NT.OPTIONAL_CALL),
         (Tag.BOOLEAN_VALUE,),
         (NT.BOOLEAN_OPTIONAL_NOT, NT.ABSTRACT_EXPR_WITH_NOT),
-        (NT.STRING_EXPR,),
+        (Tag.STRING,),
     }),
     GrammarRule(NT.ABSTRACT_EXPR_OP, {
         (Tag.MATH_OPERATOR,),
@@ -264,7 +263,7 @@ GRAMMAR_RULES = [
         (Tag.ID,),
         (Tag.BOOLEAN_VALUE,),
         (NT.NUMBER,),
-        (NT.STRING_EXPR,)
+        (Tag.STRING,)
     }),
 
     # prog
@@ -0,0 +1,92 @@
+import time
+from typing import Iterator, TextIO
+from transpiler.base import Token
+
+
+class PipelineStats:
+    """
+    Time spent in every stage of a transpilation and sizes of what the
+    stages produced.
+
+    Lexer and parser run interleaved, as do semantic analysis and code
+    generation, so time of a stage excludes time of the stage it drives:
+    'syntax' does not include tokenizing, 'semantic' does not include
+    emitting code, and 'codegen' is emitting code plus writing result.
+    Stages which were not reached are missing from seconds. Stats passed
+    to several transpilations hold sums of their times and sizes.
+    """
+
+    STAGES = ('lexer', 'syntax', 'semantic', 'codegen')
+
+    __slots__ = ('seconds', 'tokens', 'nodes', 'variables', 'output_bytes')
+
+    def __init__(self):
+        self.seconds: dict[str, float] = {}
+        self.tokens = 0
+        self.nodes = 0
+        self.variables = 0
+        self.output_bytes = 0
+
+    def add_time(self, stage: str, seconds: float):
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+
+    def as_dict(self) -> dict:
+        return {
+            'seconds': dict(self.seconds),
+            'tokens': self.tokens,
+            'nodes': self.nodes,
+            'variables': self.variables,
+            'output_bytes': self.output_bytes,
+        }
+
+
+def timed_tokens(tokens: Iterator[Token],
+                 stats: PipelineStats) -> Iterator[Token]:
+    """
+    Yield tokens, adding time spent producing them to 'lexer' stage.
+    """
+    perf_counter = time.perf_counter
+    seconds = 0.0
+    try:
+        while True:
+            start = perf_counter()
+            try:
+                token = next(tokens)
+            except StopIteration:
+                return
+            finally:
+                seconds += perf_counter() - start
+            stats.tokens += 1
+            yield token
+    finally:
+        stats.add_time('lexer', seconds)
+
+
+def timed(func, stats: PipelineStats, stage: str):
+    """
+    Wrap func, adding time spent in its calls to stage.
+    """
+    perf_counter = time.perf_counter
+
+    def wrapper(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stats.add_time(stage, perf_counter() - start)
+
+    return wrapper
+
+
+class CountingStream:
+    """
+    Text stream wrapper counting UTF-8 bytes written through it.
+    """
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self.bytes = 0
+
+    def write(self, text: str) -> int:
+        self.bytes += len(text.encode())
+        return self.stream.write(text)
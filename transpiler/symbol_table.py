@@ -0,0 +1,61 @@
+import sys
+
+
+class SymbolTable:
+    """
+    Variables of nested scopes.
+
+    Every name maps to a stack of its bindings with the innermost one on
+    top, and every scope remembers names declared in it. So resolving a
+    name does not depend on nesting depth, and leaving a scope costs one
+    pop per variable declared in it.
+
+    Binding is a dict with 'type' and 'expr' (terminals of the initial
+    value) keys.
+    """
+
+    def __init__(self):
+        self._bindings: dict[str, list[dict]] = {}
+        # names declared in every scope, global scope first
+        self._scopes: list[list[str]] = [[]]
+        # number of declarations in all scopes, including left ones
+        self.declared = 0
+
+    @property
+    def depth(self) -> int:
+        """
+        0 for global scope, 1 for nested if/for/while/repeat, 2 for
+        subnested and so on.
+        """
+        return len(self._scopes) - 1
+
+    def push_scope(self):
+        self._scopes.append([])
+
+    def pop_scope(self):
+        for name in self._scopes.pop():
+            stack = self._bindings[name]
+            stack.pop()
+            if not stack:
+                del self._bindings[name]
+
+    def declare(self, name: str, type, expr: list) -> dict:
+        name = sys.intern(name)
+        binding = {'type': type, 'expr': expr}
+        self._bindings.setdefault(name, []).append(binding)
+        self._scopes[-1].append(name)
+        self.declared += 1
+        return binding
+
+    def resolve(self, name: str) -> dict | None:
+        stack = self._bindings.get(name)
+        return stack[-1] if stack else None
+
+    def get_type(self, name: str):
+        stack = self._bindings.get(name)
+        if not stack:
+            raise ValueError(f'variable is not defined: {name}')
+        return stack[-1]['type']
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._bindings
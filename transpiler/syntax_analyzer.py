@@ -1,7 +1,8 @@
 from sty import fg
-from functools import lru_cache
 import logging
+from pathlib import Path
 from typing import Any, Generator
+from transpiler import grammar_cache
 from transpiler.base import (
     NormalizedGrammarRule,
     Symbol,
@@ -14,6 +15,7 @@ from transpiler.base import (
     normalize_rules,
 )
 from transpiler.tree import ParseTree, Node
+from transpiler.trace import Tracer
 
 
 logger = logging.getLogger(__name__)
@@ -31,18 +33,50 @@ class SyntaxAnalyzer:
     def __init__(
         self,
         rules: list[GrammarRule] | tuple[GrammarRule],
-        filepath: str | None = None
+        filepath: str | None = None,
+        cache_path: Path | None = None,
+        tracer: Tracer | None = None,
     ):
         self.rules = rules
         self._first: dict[NonTerminal, set[Terminal | Special]] = {}
         self._follow: dict[NonTerminal, set[Terminal | Special]] = {}
         self._predict_table: dict[NonTerminal, dict[Terminal, GrammarRule]] = {}
 
+        # predict table with placeholder tokens for the nodes each rule adds
+        self._parse_table: dict[
+            NonTerminal,
+            dict[Terminal, tuple[NormalizedGrammarRule, tuple[Token, ...]]]
+        ] = {}
+
         self.filepath = filepath
+        self.tracer = tracer
+        self.start_symbol = self.__get_start_symbol()
+
+        if cache_path is not None and self.load(cache_path):
+            return
 
         self._build_first()
         self._build_follow()
         self._build_predict_table()
+        self._build_parse_table()
+
+        if cache_path is not None:
+            try:
+                self.dump(cache_path)
+            except OSError as error:
+                logger.warning(f'cannot write grammar cache: {error}')
+
+    def load(self, path: Path) -> bool:
+        cached = grammar_cache.load(path, self.rules)
+        if cached is None:
+            return False
+        self._first, self._follow, self._predict_table = cached
+        self._build_parse_table()
+        return True
+
+    def dump(self, path: Path):
+        grammar_cache.dump(path, self.rules, self._first, self._follow,
+                           self._predict_table)
 
     def first(self, chain: Symbol | tuple) -> set[Terminal]:
         if isinstance(chain, Symbol):
@@ -77,7 +111,6 @@ class SyntaxAnalyzer:
                         self._first[rule.left] = result
                         changed = True
 
-    @lru_cache
     def __get_start_symbol(self):
         start_symbol = self.rules[0].left
         if start_symbol is not Special.START and \
@@ -87,8 +120,7 @@ class SyntaxAnalyzer:
         return start_symbol
 
     def _build_follow(self):
-        start_symbol = self.__get_start_symbol()
-        self._follow[start_symbol] = {Special.LIMITER}
+        self._follow[self.start_symbol] = {Special.LIMITER}
 
         changed = True
         while changed:
@@ -148,6 +180,24 @@ class SyntaxAnalyzer:
         else:
             self._predict_table[key1][key2] = rule
 
+    def _build_parse_table(self):
+        """
+        Placeholder tokens are shared by all nodes of the same symbol: parser
+        replaces them with real tokens for terminals and never changes them
+        for non-terminals.
+        """
+        placeholders = {}
+        self._parse_table = {}
+        for left, row in self._predict_table.items():
+            parse_row = self._parse_table[left] = {}
+            for terminal, rule in row.items():
+                parse_row[terminal] = (rule, tuple(
+                    placeholders.setdefault(symbol,
+                                            Token(symbol, symbol.value))
+                    for symbol in rule.right
+                    if symbol is not Special.LAMBDA
+                ))
+
     def predict(self, key1, key2) -> NormalizedGrammarRule:
         val1 = self._predict_table.get(key1)
         if val1 is None:
@@ -155,25 +205,36 @@ class SyntaxAnalyzer:
         return self._predict_table[key1].get(key2)
 
     def parse(self, tokens: Generator[Token, Any, Any]) -> ParseTree:
-        tree = ParseTree(root=self.__get_start_symbol())
+        tree = ParseTree(root=self.start_symbol)
         head: Node = tree.root
-        stack: list[Node] = [head, ParseTree.get_node(Special.LIMITER)]
+
+        # top of the stack is its last element
+        stack: list[Node] = [ParseTree.get_node(Special.LIMITER), head]
         token = tokens.__next__()
 
-        while head.tag != Special.LIMITER:
+        debug = logger.isEnabledFor(logging.DEBUG)
+        tracer = self.tracer
+        parse_table = self._parse_table
+
+        while head.tag is not Special.LIMITER:
             current_token = token
-            if head.tag == token.tag:
+            if head.tag is token.tag:
                 head.token = token
-                prev_token = stack.pop(0).token
-                logger.debug(
-                    f'parsed token {fg.li_yellow}{token}{fg.rs} at line '
-                    f'{token.line} ({token.tag}), '
-                    f'waiting {stack[0]}'
-                )
+                prev_token = stack.pop().token
+                if debug:
+                    logger.debug(
+                        f'parsed token {fg.li_yellow}{token}{fg.rs} at line '
+                        f'{token.line} ({token.tag}), '
+                        f'waiting {stack[-1]}'
+                    )
+                if tracer is not None:
+                    tracer.record('match', token)
                 token = tokens.__next__()
-            elif isinstance(head.tag, Terminal) or \
-                    (rule := self.predict(head.tag, current_token.tag)) is None:
-                logger.debug(f'head: {head}, stack: {stack}')
+            elif isinstance(head.tag, Terminal) or (
+                entry := parse_table.get(head.tag, {}).get(token.tag)
+            ) is None:
+                if debug:
+                    logger.debug(f'head: {head}, stack: {stack[::-1]}')
                 expected_token = head.tag.value.replace('_', ' ')
                 line = current_token.line
                 msg = (
@@ -187,13 +248,15 @@ class SyntaxAnalyzer:
                     msg += f' ({self.filepath}:{line})'
                 raise SyntaxError(msg)
             else:
-                logger.debug(f'using rule {rule}')
-                stack.pop(0)
-                for symbol in reversed(rule.right):
-                    if symbol is Special.LAMBDA:
-                        continue
-                    node = tree.add(symbol, to=head)
-                    stack.insert(0, node)
-            head = stack[0]
+                rule, placeholders = entry
+                if debug:
+                    logger.debug(f'using rule {rule}')
+                if tracer is not None:
+                    tracer.record('rule', rule)
+                stack.pop()
+                children = [Node(placeholder, head)
+                            for placeholder in placeholders]
+                stack.extend(reversed(children))
+            head = stack[-1]
 
         return tree
@@ -0,0 +1,29 @@
+from collections import deque
+from transpiler.base import Token
+
+
+class Tracer:
+    """
+    Ring buffer of the latest lexer and parser events.
+
+    Events are stored as they are and formatted only by dump(), so
+    recording costs a tuple and a deque append.
+    """
+
+    def __init__(self, size: int):
+        self.events: deque[tuple[str, object]] = deque(maxlen=size)
+
+    def record(self, event: str, value: object):
+        self.events.append((event, value))
+
+    def dump(self) -> str:
+        lines = []
+        for event, value in self.events:
+            if isinstance(value, Token):
+                lines.append(
+                    f'{event} {value.tag} {value.value!r} '
+                    f'at {value.line}:{value.column}'
+                )
+            else:
+                lines.append(f'{event} {value!r}')
+        return '\n'.join(lines)
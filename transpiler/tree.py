@@ -3,13 +3,15 @@ from transpiler.base import Token, Symbol
 
 
 class Node:
+    __slots__ = ('token', 'parent', 'children')
+
     def __init__(self, token: Token, parent=None):
         self.token = token
         self.parent = parent
         self.children = []
 
         if self.parent is not None:
-            self.parent.children.insert(0, self)
+            self.parent.children.append(self)
 
     def __repr__(self) -> str:
         return f'Node({self.token})'
@@ -22,7 +24,7 @@ class Node:
 class SyntaxTree(ABC):
     def __init__(self, root):
         self.root = self.get_node(root)
-        self.vars_dict = {}
+        self.symbol_table = None
 
     @staticmethod
     def get_node(value: Node | Token | Symbol, parent: Node = None) -> Node:
@@ -35,6 +37,15 @@ class SyntaxTree(ABC):
     def add(self, value, to: Node) -> Node:
         return self.get_node(value, to)
 
+    def count_nodes(self) -> int:
+        count = 0
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            count += 1
+            stack.extend(node.children)
+        return count
+
 
 class ParseTree(SyntaxTree):
     pass
@@ -0,0 +1,136 @@
+"""
+Changes of source files for watch mode of CLI.
+
+Uses watchfiles (inotify and alike) if it is installed, otherwise polls
+modification times of the files.
+"""
+import glob
+import time
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+try:
+    import watchfiles
+except ImportError:
+    watchfiles = None
+
+
+# changes coming within this time are reported together, in milliseconds
+DEBOUNCE_MS = 50
+# time between checks of modification times, in seconds
+POLL_INTERVAL = 0.25
+# longest wait for changes of watchfiles, so it is known soon to be
+# running, in milliseconds
+STARTED_TIMEOUT_MS = 100
+
+
+def watch_roots(sources: list[str]) -> list[Path]:
+    """
+    Directories to watch for sources given to CLI. Files are watched
+    through their directories, since editors often replace a file rather
+    than write to it.
+    """
+    roots = set()
+    for source in sources:
+        path = Path(source)
+        if path.is_dir():
+            roots.add(path)
+        elif not glob.has_magic(source):
+            roots.add(path.parent)
+        else:
+            # longest part of the pattern without wildcards
+            parts = []
+            for part in path.parts:
+                if glob.has_magic(part):
+                    break
+                parts.append(part)
+            roots.add(Path(*parts) if parts else Path())
+    return sorted(root.resolve() for root in roots)
+
+
+def stat_sources(
+    list_sources: Callable[[], Iterable[Path]],
+) -> dict[Path, tuple[int, int]]:
+    stats = {}
+    for path in list_sources():
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        stats[path.resolve()] = (stat.st_mtime_ns, stat.st_size)
+    return stats
+
+
+def changed_sources(previous: dict[Path, tuple[int, int]],
+                    current: dict[Path, tuple[int, int]]) -> set[Path]:
+    return {
+        path for path, stat in current.items()
+        if previous.get(path) != stat
+    }
+
+
+def poll_changes(
+    list_sources: Callable[[], Iterable[Path]],
+    previous: dict[Path, tuple[int, int]],
+    interval: float = POLL_INTERVAL,
+) -> Iterator[set[Path]]:
+    """
+    Yield sets of resolved paths of sources which were modified or
+    created since previous check, the first one since previous stats.
+    """
+    while True:
+        time.sleep(interval)
+        current = stat_sources(list_sources)
+        changed = changed_sources(previous, current)
+        previous = current
+        if changed:
+            yield changed
+
+
+def notify_changes(
+    sources: list[str],
+    list_sources: Callable[[], Iterable[Path]],
+    previous: dict[Path, tuple[int, int]],
+) -> Iterator[set[Path]]:
+    """
+    Yield sets of resolved paths reported by watchfiles. Sources changed
+    since previous stats and before the watcher was started are added to
+    the first set.
+    """
+    missed = None
+    for changes in watchfiles.watch(
+        *watch_roots(sources),
+        debounce=DEBOUNCE_MS,
+        step=10,
+        rust_timeout=STARTED_TIMEOUT_MS,
+        yield_on_timeout=True,
+    ):
+        changed = {
+            Path(path).resolve() for change, path in changes
+            if change is not watchfiles.Change.deleted
+        }
+        if missed is None:
+            # the watcher is running once it has returned
+            missed = changed_sources(previous, stat_sources(list_sources))
+            changed |= missed
+        if changed:
+            yield changed
+
+
+def watch_changes(
+    sources: list[str],
+    list_sources: Callable[[], Iterable[Path]],
+    force_polling: bool = False,
+) -> Iterator[set[Path]]:
+    """
+    Return iterator of sets of resolved paths which were modified or
+    created. Paths of other files under watched directories may be
+    reported as well.
+
+    Sources are checked on this call, so ones saved after it and before
+    iteration starts, e.g. during the initial build, are reported too.
+    """
+    previous = stat_sources(list_sources)
+    if watchfiles is None or force_polling:
+        return poll_changes(list_sources, previous)
+    return notify_changes(sources, list_sources, previous)
@@ -1,12 +1,9 @@
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
-from web.settings import STATIC_DIR
+from fastapi.middleware.gzip import GZipMiddleware
+from web.settings import GZIP_MIN_SIZE
 
 
 app = FastAPI()
 
-app.mount(
-    '/static',
-    StaticFiles(directory=STATIC_DIR),
-    name='static'
-)
+# static files are gzipped once on load, this compresses api responses
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_SIZE, compresslevel=6)
@@ -1,28 +1,156 @@
-import traceback
-from fastapi.responses import HTMLResponse
-from transpiler.base import TranspilerError
-from transpiler import transpile
-from web import app
-from web.settings import STATIC_DIR
-from web.schemas import Code, TranspileResult
+from fastapi import HTTPException, Request, Response, WebSocket, status
+from web import app, metrics
+from web.assets import IMMUTABLE, REVALIDATE, StaticAssets
+from web.cache import ResultCache, source_key
+from web.live import LiveSession
+from web.pool import PoolSaturatedError, TranspilePool, WorkerLostResult
+from web.settings import (
+    STATIC_DIR,
+    TRANSPILE_WORKERS,
+    TRANSPILE_QUEUE_SIZE,
+    TRANSPILE_SMALL_WORKERS,
+    SMALL_SOURCE_SIZE,
+    RESULT_CACHE_ENTRIES,
+    RESULT_CACHE_BYTES,
+    BATCH_MAX_SIZE,
+    GZIP_MIN_SIZE,
+)
+from web.schemas import (
+    Batch,
+    BatchResult,
+    CacheStats,
+    Code,
+    NamedTranspileResult,
+    TranspileResult,
+)
+
+
+pool = TranspilePool(
+    TRANSPILE_WORKERS,
+    TRANSPILE_QUEUE_SIZE,
+    TRANSPILE_SMALL_WORKERS,
+    SMALL_SOURCE_SIZE,
+)
+cache = ResultCache(RESULT_CACHE_ENTRIES, RESULT_CACHE_BYTES)
+assets = StaticAssets(STATIC_DIR, 'index.html', 'static/', GZIP_MIN_SIZE)
+
+
+def busy() -> HTTPException:
+    return HTTPException(
+        status.HTTP_503_SERVICE_UNAVAILABLE,
+        'transpiler is busy, try again later',
+        headers={'Retry-After': '1'},
+    )
+
+
+@app.on_event('startup')
+async def start_pool():
+    await pool.start()
+
+
+@app.on_event('shutdown')
+def stop_pool():
+    pool.shutdown()
 
 
 @app.get('/')
-async def get_page() -> HTMLResponse:
-    return HTMLResponse((STATIC_DIR / 'index.html').read_bytes())
+async def get_page(request: Request) -> Response:
+    return assets.index.response(request, REVALIDATE)
+
+
+@app.get('/static/{name:path}')
+async def get_static(name: str, request: Request) -> Response:
+    asset = assets.get(name)
+    if asset is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND)
+    if request.query_params.get('v') == asset.version:
+        return asset.response(request, IMMUTABLE)
+    return asset.response(request, REVALIDATE)
 
 
 @app.post('/transpile')
 async def get_transpiled(code: Code) -> TranspileResult:
+    key = source_key(code.code)
+    result = cache.get(key)
+    if result is not None:
+        return result
     try:
-        result = transpile(code.code)
-        return TranspileResult(
-            result=result,
-            success=True,
-        )
-    except TranspilerError as error:
-        traceback.print_exc()
-        return TranspileResult(
-            result=f'{error.__class__.__name__}: {error}',
-            success=False,
+        result = await pool.transpile(code.code)
+    except PoolSaturatedError:
+        raise busy()
+    if not isinstance(result, WorkerLostResult):
+        cache.put(key, result)
+    return result
+
+
+@app.post('/transpile/batch')
+async def get_transpiled_batch(batch: Batch) -> BatchResult:
+    if len(batch.sources) > BATCH_MAX_SIZE:
+        raise HTTPException(
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            f'batch has {len(batch.sources)} sources, '
+            f'limit is {BATCH_MAX_SIZE}',
         )
+    keys = [source_key(source.code) for source in batch.sources]
+    results = {}
+    # sources not in cache, every distinct one is transpiled once
+    missing = {}
+    for key, source in zip(keys, batch.sources):
+        result = cache.get(key)
+        if result is not None:
+            results[key] = result
+        else:
+            missing[key] = source.code
+    try:
+        transpiled = await pool.transpile_many(list(missing.values()))
+    except PoolSaturatedError:
+        raise busy()
+    for key, result in zip(missing, transpiled):
+        if not isinstance(result, WorkerLostResult):
+            cache.put(key, result)
+        results[key] = result
+    return BatchResult(results=[
+        NamedTranspileResult(name=source.name, **results[key].dict())
+        for key, source in zip(keys, batch.sources)
+    ])
+
+
+@app.websocket('/live')
+async def transpile_live(websocket: WebSocket):
+    await LiveSession(websocket, pool, cache).run()
+
+
+@app.get('/cache')
+async def get_cache_stats() -> CacheStats:
+    return cache.stats()
+
+
+@app.get('/metrics')
+async def get_metrics() -> Response:
+    content = metrics.render(
+        metrics.sample(
+            'transpiler_pool_pending_jobs',
+            'Jobs running or waiting in the process pool.',
+            'gauge',
+            pool.pending,
+        ),
+        metrics.sample(
+            'transpiler_cache_hits_total',
+            'Requests served from the result cache.',
+            'counter',
+            cache.hits,
+        ),
+        metrics.sample(
+            'transpiler_cache_misses_total',
+            'Requests not found in the result cache.',
+            'counter',
+            cache.misses,
+        ),
+        metrics.sample(
+            'transpiler_cache_evictions_total',
+            'Results evicted from the result cache.',
+            'counter',
+            cache.evictions,
+        ),
+    )
+    return Response(content, media_type='text/plain; version=0.0.4')
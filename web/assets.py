@@ -0,0 +1,100 @@
+"""
+Static files kept in memory.
+"""
+import gzip
+import hashlib
+import mimetypes
+import re
+from pathlib import Path
+from fastapi import Request, Response, status
+
+
+# cache headers of files requested by versioned urls and of other
+# responses, which are always revalidated by ETag
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+
+class Asset:
+    __slots__ = ('content', 'gzipped', 'etag', 'media_type')
+
+    def __init__(self, content: bytes, media_type: str, gzip_min_size: int):
+        self.content = content
+        self.media_type = media_type
+        self.etag = hashlib.blake2b(content, digest_size=16).hexdigest()
+        self.gzipped = None
+        if len(content) >= gzip_min_size:
+            gzipped = gzip.compress(content, mtime=0)
+            if len(gzipped) < len(content):
+                self.gzipped = gzipped
+
+    @property
+    def version(self) -> str:
+        return self.etag[:12]
+
+    def response(self, request: Request, cache_control: str) -> Response:
+        use_gzip = (
+            self.gzipped is not None and
+            'gzip' in request.headers.get('Accept-Encoding', '')
+        )
+        # representations differ, so have to be tagged differently
+        etag = f'"{self.etag}-gzip"' if use_gzip else f'"{self.etag}"'
+        headers = {'ETag': etag, 'Cache-Control': cache_control}
+        if self.gzipped is not None:
+            headers['Vary'] = 'Accept-Encoding'
+        if etag in request.headers.get('If-None-Match', ''):
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED,
+                headers=headers,
+            )
+        if use_gzip:
+            headers['Content-Encoding'] = 'gzip'
+        return Response(
+            self.gzipped if use_gzip else self.content,
+            media_type=self.media_type,
+            headers=headers,
+        )
+
+
+class StaticAssets:
+    """
+    Files of a directory loaded once, with hashes and gzipped copies.
+
+    Links to files of the directory in the index page get ?v=<hash>
+    query, so the files may be cached forever and are still reloaded by
+    browsers when they change.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        index: str,
+        url_prefix: str,
+        gzip_min_size: int,
+    ):
+        self.files: dict[str, Asset] = {}
+        for path in sorted(directory.rglob('*')):
+            if path.is_file():
+                media_type = mimetypes.guess_type(path.name)[0]
+                self.files[path.relative_to(directory).as_posix()] = Asset(
+                    path.read_bytes(),
+                    media_type or 'application/octet-stream',
+                    gzip_min_size,
+                )
+
+        def add_version(match: re.Match) -> str:
+            name = match.group(1)
+            if name not in self.files:
+                return match.group(0)
+            return f'{url_prefix}{name}?v={self.files[name].version}'
+
+        page = self.files[index].content.decode()
+        page = re.sub(
+            rf'(?<=["\']){re.escape(url_prefix)}([^"\'?#]+)(?=["\'])',
+            add_version,
+            page,
+        )
+        self.index = Asset(page.encode(), 'text/html', gzip_min_size)
+
+    def get(self, name: str) -> Asset | None:
+        return self.files.get(name)
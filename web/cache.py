@@ -0,0 +1,65 @@
+"""
+Cache of transpilation results addressed by hash of source code.
+"""
+import hashlib
+from collections import OrderedDict
+from web.schemas import CacheStats, TranspileResult
+
+
+def source_key(code: str) -> bytes:
+    return hashlib.blake2b(code.encode(), digest_size=16).digest()
+
+
+class ResultCache:
+    """
+    LRU cache bounded by number of entries and total size of results.
+
+    Failed transpilations are cached as well: the result only depends on
+    the source code, so an unchanged broken program fails the same way.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # key -> (result, size), least recently used first
+        self._entries: OrderedDict[bytes, tuple[TranspileResult, int]] = \
+            OrderedDict()
+
+    def get(self, key: bytes) -> TranspileResult | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: bytes, result: TranspileResult):
+        size = len(key) + len(result.result.encode())
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old[1]
+        self._entries[key] = (result, size)
+        self.bytes += size
+        while (len(self._entries) > self.max_entries or
+               self.bytes > self.max_bytes):
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.bytes -= evicted_size
+            self.evictions += 1
+
+    def stats(self) -> CacheStats:
+        return CacheStats(
+            entries=len(self._entries),
+            bytes=self.bytes,
+            max_entries=self.max_entries,
+            max_bytes=self.max_bytes,
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+        )
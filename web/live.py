@@ -0,0 +1,130 @@
+"""
+Live transpilation of an editor buffer over WebSocket.
+"""
+import asyncio
+import traceback
+from concurrent.futures import Future
+from fastapi import WebSocket, WebSocketDisconnect, status
+from pydantic import ValidationError
+from web.cache import ResultCache, source_key
+from web.pool import (
+    PoolSaturatedError,
+    TranspilePool,
+    record_stats,
+    run_transpile,
+)
+from web.schemas import LiveCode, LiveResult, TranspileResult
+
+
+# delay before transpiling again when pool is saturated, in seconds
+RETRY_DELAY = 1
+
+
+class LiveSession:
+    """
+    Transpiles the latest version of a buffer sent by one editor.
+
+    Client sends LiveCode messages with increasing versions and receives
+    LiveResult of the latest version only. A session has at most one job
+    in pool: job of a superseded version is cancelled while it waits for
+    a worker, and its result is dropped if it is already running.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        pool: TranspilePool,
+        cache: ResultCache,
+    ):
+        self.websocket = websocket
+        self.pool = pool
+        self.cache = cache
+        self.latest: LiveCode | None = None
+        self.changed = asyncio.Event()
+        self.job: Future | None = None
+
+    async def run(self):
+        """
+        Serve the session until client disconnects or either of receiving
+        and transpiling fails, so a failure never leaves the client
+        without replies.
+        """
+        await self.websocket.accept()
+        receiving = asyncio.create_task(self.receive())
+        transpiling = asyncio.create_task(self.transpile_latest())
+        try:
+            await asyncio.wait(
+                [receiving, transpiling],
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+        finally:
+            receiving.cancel()
+            transpiling.cancel()
+            if self.job is not None:
+                self.job.cancel()
+            await asyncio.gather(receiving, transpiling,
+                                 return_exceptions=True)
+
+        if not receiving.cancelled():
+            error = receiving.exception()
+            if isinstance(error, ValidationError):
+                await self.websocket.close(status.WS_1003_UNSUPPORTED_DATA)
+            elif not isinstance(error, WebSocketDisconnect):
+                raise error
+        else:
+            # transpile_latest() only returns by raising
+            traceback.print_exception(transpiling.exception())
+            await self.websocket.close(status.WS_1011_INTERNAL_ERROR)
+
+    async def receive(self):
+        while True:
+            self.latest = LiveCode.parse_obj(
+                await self.websocket.receive_json()
+            )
+            self.changed.set()
+            if self.job is not None:
+                # no-op if a worker has already started it
+                self.job.cancel()
+
+    async def transpile_latest(self):
+        while True:
+            await self.changed.wait()
+            self.changed.clear()
+            code, self.latest = self.latest, None
+            key = source_key(code.code)
+            result = self.cache.get(key)
+            if result is None:
+                try:
+                    self.job = self.pool.submit_job(
+                        run_transpile, code.code, size=len(code.code)
+                    )
+                except PoolSaturatedError:
+                    await self.retry(code)
+                    continue
+                done = asyncio.wrap_future(self.job)
+                await asyncio.wait([done])
+                self.job = None
+                if done.cancelled():
+                    continue
+                try:
+                    result = record_stats(*done.result())
+                except Exception as error:
+                    # e.g. a worker process died, try again on next change
+                    traceback.print_exc()
+                    result = TranspileResult(
+                        result=f'{error.__class__.__name__}: {error}',
+                        success=False,
+                    )
+                else:
+                    self.cache.put(key, result)
+                if self.latest is not None:
+                    continue
+            await self.websocket.send_json(
+                LiveResult(version=code.version, **result.dict()).dict()
+            )
+
+    async def retry(self, code: LiveCode):
+        await asyncio.sleep(RETRY_DELAY)
+        if self.latest is None:
+            self.latest = code
+        self.changed.set()
@@ -0,0 +1,138 @@
+"""
+Metrics of transpilation in Prometheus text format.
+
+Transpilation runs in worker processes, so workers return PipelineStats
+as dicts along with results and metrics are recorded by the server
+process.
+"""
+import bisect
+from transpiler.stats import PipelineStats
+
+
+def format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ''
+    pairs = ','.join(
+        f'{name}="{value}"' for name, value in zip(names, values)
+    )
+    return '{' + pairs + '}'
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [
+            f'# HELP {self.name} {self.help}',
+            f'# TYPE {self.name} counter',
+        ]
+        for label_values, value in self.values.items():
+            labels = format_labels(self.labels, label_values)
+            lines.append(f'{self.name}{labels} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: list[float],
+                 labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.buckets = sorted(buckets)
+        self.labels = labels
+        # label values -> (counts per bucket and +Inf, sum)
+        self.values: dict[tuple[str, ...], tuple[list[int], float]] = {}
+
+    def observe(self, value: float, *label_values: str):
+        counts, total = self.values.get(
+            label_values, ([0] * (len(self.buckets) + 1), 0.0)
+        )
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.values[label_values] = (counts, total + value)
+
+    def render(self) -> list[str]:
+        lines = [
+            f'# HELP {self.name} {self.help}',
+            f'# TYPE {self.name} histogram',
+        ]
+        bounds = [str(bucket) for bucket in self.buckets] + ['+Inf']
+        for label_values, (counts, total) in self.values.items():
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                labels = format_labels(
+                    self.labels + ('le',), label_values + (bound,)
+                )
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = format_labels(self.labels, label_values)
+            lines.append(f'{self.name}_sum{labels} {total}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+def sample(name: str, help: str, type: str, value: float) -> list[str]:
+    """
+    Metric without labels whose value is kept elsewhere.
+    """
+    return [
+        f'# HELP {name} {help}',
+        f'# TYPE {name} {type}',
+        f'{name} {value}',
+    ]
+
+
+SECONDS_BUCKETS = [
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+]
+# 16, 64, ..., 4194304
+SIZE_BUCKETS = [4 ** power for power in range(2, 12)]
+
+transpilations = Counter(
+    'transpiler_transpilations_total',
+    'Transpilations run by workers.',
+    ('success',),
+)
+stage_seconds = Histogram(
+    'transpiler_stage_seconds',
+    'Time spent in a stage of transpilation pipeline.',
+    SECONDS_BUCKETS,
+    ('stage',),
+)
+sizes = {
+    field: Histogram(
+        f'transpiler_{field}',
+        f'Number of {field.replace("_", " ")} of a transpiled program.',
+        SIZE_BUCKETS,
+    )
+    for field in ('tokens', 'nodes', 'variables', 'output_bytes')
+}
+
+
+def record(stats: dict, success: bool):
+    """
+    Record PipelineStats.as_dict() of one transpilation. Sizes are only
+    recorded for successful ones, as failed stop at an arbitrary point.
+    """
+    transpilations.inc('true' if success else 'false')
+    for stage in PipelineStats.STAGES:
+        if stage in stats['seconds']:
+            stage_seconds.observe(stats['seconds'][stage], stage)
+    if success:
+        for field, histogram in sizes.items():
+            histogram.observe(stats[field])
+
+
+def render(*extra: list[str]) -> str:
+    lines = transpilations.render() + stage_seconds.render()
+    for histogram in sizes.values():
+        lines += histogram.render()
+    for metric in extra:
+        lines += metric
+    return '\n'.join(lines) + '\n'
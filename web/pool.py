@@ -0,0 +1,241 @@
+"""
+Process pool which runs transpilation off the event loop.
+"""
+import asyncio
+import traceback
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from transpiler import transpile
+from transpiler.stats import PipelineStats
+from web import metrics
+from web.schemas import TranspileResult
+
+
+WARM_UP_CODE = """
+var a: integer := 1;
+begin
+    if a > 0 then
+        writeln('a', a);
+end.
+"""
+
+
+class PoolSaturatedError(Exception):
+    pass
+
+
+class WorkerLostResult(TranspileResult):
+    """
+    Failure of a job whose worker process died, e.g. killed by a signal.
+    It does not depend on the source only, so it must not be cached.
+    """
+
+    @classmethod
+    def from_error(cls, error: BrokenProcessPool) -> 'WorkerLostResult':
+        return cls(result=f'{error.__class__.__name__}: {error}',
+                   success=False)
+
+
+def warm_up():
+    """
+    Initializer of worker processes: load grammar and run every stage of
+    pipeline once, so the first real request is not slower than others.
+    """
+    transpile(WARM_UP_CODE)
+
+
+def run_transpile(code: str) -> tuple[TranspileResult, dict]:
+    """
+    Return result with PipelineStats dict, to be recorded by the server
+    process.
+
+    Any exception fails this code only: a bug of transpiler hit by one
+    source of a batch must not lose results of the others.
+    """
+    stats = PipelineStats()
+    try:
+        result = TranspileResult(
+            result=transpile(code, stats=stats),
+            success=True,
+        )
+    except Exception as error:
+        traceback.print_exc()
+        result = TranspileResult(
+            result=f'{error.__class__.__name__}: {error}',
+            success=False,
+        )
+    return result, stats.as_dict()
+
+
+def run_transpile_many(codes: list[str]) -> list[tuple]:
+    return [run_transpile(code) for code in codes]
+
+
+def record_stats(result: TranspileResult, stats: dict) -> TranspileResult:
+    metrics.record(stats, result.success)
+    return result
+
+
+class TranspilePool:
+    """
+    ProcessPoolExecutor with a bound on accepted jobs, and a lane of
+    processes reserved for small sources.
+
+    At most workers + small_workers + queue_size jobs are running or
+    waiting at once, submit() raises PoolSaturatedError instead of
+    queueing more. A job is counted until its process finishes it, even
+    if the awaiting request was cancelled.
+
+    Jobs given size of at most small_size characters run in the reserved
+    lane when all general workers are busy, so they never wait behind
+    large programs. Other jobs, including batches, run in general lane.
+
+    When a worker process dies, its executor is broken and rejects every
+    job, so it is replaced by a new one. Jobs it was running fail with
+    WorkerLostResult.
+
+    Must be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        queue_size: int,
+        small_workers: int = 0,
+        small_size: int = 0,
+    ):
+        self.workers = workers
+        self.small_workers = small_workers
+        self.small_size = small_size
+        self.limit = workers + small_workers + queue_size
+        self.pending = 0
+        # jobs running or waiting in general lane
+        self.general_pending = 0
+        self.executor: ProcessPoolExecutor | None = None
+        self.small_executor: ProcessPoolExecutor | None = None
+
+    async def start(self):
+        self.executor = ProcessPoolExecutor(self.workers, initializer=warm_up)
+        executors = [self.executor] * self.workers
+        if self.small_workers > 0:
+            self.small_executor = ProcessPoolExecutor(
+                self.small_workers, initializer=warm_up
+            )
+            executors += [self.small_executor] * self.small_workers
+        # processes are started on demand, make all of them start now
+        await asyncio.gather(*[
+            asyncio.wrap_future(executor.submit(int))
+            for executor in executors
+        ])
+
+    def shutdown(self):
+        for executor in (self.executor, self.small_executor):
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+        self.executor = self.small_executor = None
+
+    def reserve(self, jobs: int):
+        if self.pending + jobs > self.limit:
+            raise PoolSaturatedError(
+                f'{self.pending} jobs are pending, limit is {self.limit}'
+            )
+
+    def replace_broken(self, executor: ProcessPoolExecutor):
+        """
+        Replace executor, unless it is already replaced. Processes of the
+        new one are started on demand.
+        """
+        if executor is self.executor:
+            self.executor = ProcessPoolExecutor(
+                self.workers, initializer=warm_up
+            )
+        elif executor is self.small_executor:
+            self.small_executor = ProcessPoolExecutor(
+                self.small_workers, initializer=warm_up
+            )
+        else:
+            return
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def is_small(self, size: int | None) -> bool:
+        """
+        Whether a job of size goes to the reserved lane now.
+        """
+        return (
+            self.small_executor is not None and
+            size is not None and
+            size <= self.small_size and
+            self.general_pending >= self.workers
+        )
+
+    def submit_job(self, func, *args, size: int | None = None) -> Future:
+        """
+        Like submit(), but return future of executor. Unlike asyncio
+        future it tells whether job is running, and cancelling it never
+        cancels an awaiting task.
+        """
+        self.reserve(1)
+        loop = asyncio.get_running_loop()
+        small = self.is_small(size)
+        executor = self.small_executor if small else self.executor
+        try:
+            future = executor.submit(func, *args)
+        except BrokenProcessPool:
+            # a worker died before its failed jobs were released
+            self.replace_broken(executor)
+            executor = self.small_executor if small else self.executor
+            future = executor.submit(func, *args)
+        self.pending += 1
+        if not small:
+            self.general_pending += 1
+        future.add_done_callback(
+            lambda _: loop.call_soon_threadsafe(
+                self._release, small, executor, future
+            )
+        )
+        return future
+
+    def submit(self, func, *args, size: int | None = None) -> asyncio.Future:
+        return asyncio.wrap_future(self.submit_job(func, *args, size=size))
+
+    def _release(self, small: bool, executor: ProcessPoolExecutor,
+                 future: Future):
+        self.pending -= 1
+        if not small:
+            self.general_pending -= 1
+        if (not future.cancelled() and
+                isinstance(future.exception(), BrokenProcessPool)):
+            self.replace_broken(executor)
+
+    async def transpile(self, code: str) -> TranspileResult:
+        try:
+            return record_stats(
+                *await self.submit(run_transpile, code, size=len(code))
+            )
+        except BrokenProcessPool as error:
+            return WorkerLostResult.from_error(error)
+
+    async def transpile_chunk(self, codes: list[str]) -> list[TranspileResult]:
+        try:
+            results = await self.submit(run_transpile_many, codes)
+        except BrokenProcessPool as error:
+            return [WorkerLostResult.from_error(error)] * len(codes)
+        return [record_stats(*item) for item in results]
+
+    async def transpile_many(self, codes: list[str]) -> list[TranspileResult]:
+        """
+        Transpile codes split into one chunk per worker, so a process is
+        sent a whole chunk at once rather than a job per code.
+        """
+        chunks = min(self.workers, len(codes))
+        if chunks == 0:
+            return []
+        self.reserve(chunks)
+        results = await asyncio.gather(*[
+            self.transpile_chunk(codes[i::chunks]) for i in range(chunks)
+        ])
+        # chunk i holds codes i, i + chunks, i + 2 * chunks, ...
+        ordered = [None] * len(codes)
+        for i, chunk in enumerate(results):
+            ordered[i::chunks] = chunk
+        return ordered
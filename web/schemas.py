@@ -8,3 +8,38 @@ class Code(BaseModel):
 class TranspileResult(BaseModel):
     success: bool
     result: str
+
+
+class CacheStats(BaseModel):
+    entries: int
+    bytes: int
+    max_entries: int
+    max_bytes: int
+    hits: int
+    misses: int
+    evictions: int
+
+
+class NamedCode(BaseModel):
+    name: str
+    code: str
+
+
+class Batch(BaseModel):
+    sources: list[NamedCode]
+
+
+class NamedTranspileResult(TranspileResult):
+    name: str
+
+
+class BatchResult(BaseModel):
+    results: list[NamedTranspileResult]
+
+
+class LiveCode(Code):
+    version: int
+
+
+class LiveResult(TranspileResult):
+    version: int
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 
@@ -14,6 +15,28 @@ PROD_UVICORN_CONFIG = BASE_UVICORN_CONFIG
 DEV_UVICORN_CONFIG = {
     **BASE_UVICORN_CONFIG,
     'reload': True,
+    # static files are loaded once on start
+    'reload_includes': ['*.py', '*.html', '*.css', '*.js'],
 }
 
 STATIC_DIR = WEB_ROOT / 'static'
+
+# processes transpiling requests, and number of requests which may wait
+# for a free process before new ones are rejected with 503
+TRANSPILE_WORKERS = int(os.getenv('TRANSPILE_WORKERS', os.cpu_count() or 1))
+TRANSPILE_QUEUE_SIZE = int(os.getenv('TRANSPILE_QUEUE_SIZE', 64))
+
+# processes reserved for sources of at most SMALL_SOURCE_SIZE characters,
+# so small requests do not wait while large programs take every worker
+TRANSPILE_SMALL_WORKERS = int(os.getenv('TRANSPILE_SMALL_WORKERS', 1))
+SMALL_SOURCE_SIZE = int(os.getenv('SMALL_SOURCE_SIZE', 4096))
+
+# bounds of cache of transpilation results
+RESULT_CACHE_ENTRIES = int(os.getenv('RESULT_CACHE_ENTRIES', 1024))
+RESULT_CACHE_BYTES = int(os.getenv('RESULT_CACHE_BYTES', 32 * 1024 * 1024))
+
+# max number of sources in one POST /transpile/batch request
+BATCH_MAX_SIZE = int(os.getenv('BATCH_MAX_SIZE', 512))
+
+# responses and static files of at least this size are gzipped
+GZIP_MIN_SIZE = int(os.getenv('GZIP_MIN_SIZE', 1024))
@@ -51,9 +51,50 @@ const destCm = CodeMirror.fromTextArea(
     }
 );
 
+function showResult(result, canDownload) {
+    destCm.setValue(result);
+    buttonDownload.toggleAttribute('disabled', !canDownload);
+    window.localStorage.setItem('destcode', result);
+    window.localStorage.setItem('canDownload', canDownload);
+}
+
+// live preview: every saved version is sent over websocket, server
+// answers with result of the latest one only
+let liveSocket = null;
+let liveVersion = 0;
+
+function connectLive() {
+    const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+    liveSocket = new WebSocket(`${protocol}//${window.location.host}/live`);
+    liveSocket.addEventListener('message', function (event) {
+        const message = JSON.parse(event.data);
+        if (message.version === liveVersion) {
+            showResult(message.result, message.success);
+        }
+    });
+    liveSocket.addEventListener('close', function () {
+        liveSocket = null;
+        setTimeout(connectLive, 1000);
+    });
+}
+
+function sendLive(sourcecode) {
+    if (liveSocket === null || liveSocket.readyState !== WebSocket.OPEN
+            || sourcecode.trim() === '') {
+        return;
+    }
+    liveVersion += 1;
+    liveSocket.send(JSON.stringify({
+        version: liveVersion,
+        code: sourcecode,
+    }));
+}
+
 sourceCm.on('change', debounce(() => {
-    window.localStorage.setItem('sourcecode', sourceCm.getValue());
+    const sourcecode = sourceCm.getValue();
+    window.localStorage.setItem('sourcecode', sourcecode);
     statusLine.innerHTML = `Saved from ${new Date().toLocaleTimeString()}`;
+    sendLive(sourcecode);
 }));
 
 buttonClear.addEventListener('click', function () {
@@ -78,15 +119,14 @@ buttonTranspile.addEventListener('click', async function () {
         })
     });
     const responseJson = await response.json();
-    const result = responseJson.result;
-    destCm.setValue(result);
-
-    const canDownload = responseJson.success;
-    buttonDownload.toggleAttribute('disabled', !canDownload);
-
+    if (!response.ok) {
+        statusLine.innerHTML = `Not transpiled: ${responseJson.detail}`;
+        return;
+    }
+    // result of an older live version must not replace this one
+    liveVersion += 1;
+    showResult(responseJson.result, responseJson.success);
     window.localStorage.setItem('sourcecode', sourcecode);
-    window.localStorage.setItem('destcode', result);
-    window.localStorage.setItem('canDownload', canDownload);
 })
 
 fileInput.addEventListener('change', function () {
@@ -104,3 +144,4 @@ buttonDownload.addEventListener('click', function () {
 });
 
 restoreData();
+connectLive();